@@ -1,9 +1,10 @@
-from go.goboard_slow import GameState
+from go.goboard import GameState
+from go.gotypes import Move
 
 
 class Agent:
     def __init__(self):
         pass
 
-    def select_move(self, game_state: GameState):
+    def select_move(self, game_state: GameState) -> Move:
         raise NotImplementedError()
@@ -0,0 +1,62 @@
+import random
+from typing import Iterable, Optional
+
+from go.agent.base import Agent
+from go.agent.helpers import is_point_an_eye
+from go.goboard import GameState
+from go.gotypes import Point, Move
+
+
+class HeuristicBot(Agent):
+    """HeuristicBot:
+    A rollout policy that's only a little smarter than RandomBot, but a lot
+    less noisy. In order of preference it will:
+
+    - capture a string that's in atari
+    - extend a string of its own that's in atari, if that gets it out
+    - play a random move that isn't an eye and doesn't put itself in atari
+
+    The first two come straight out of the board's atari index and the last
+    one checks the self-atari index, so nothing here has to read the board.
+    """
+
+    def select_move(self, game_state: GameState) -> Move:
+        board = game_state.board
+        player = game_state.next_player
+        self_atari = board.self_atari_points(player)
+
+        capture = self._first_valid(game_state, board.atari_liberties(player.other))
+        if capture:
+            return capture
+
+        escapes = [p for p in board.atari_liberties(player) if p not in self_atari]
+        escape = self._first_valid(game_state, escapes)
+        if escape:
+            return escape
+
+        candidates = []
+        for r in range(1, board.num_rows + 1):
+            for c in range(1, board.num_cols + 1):
+                candidate = Point(row=r, col=c)
+                if (
+                    board.get(candidate) is None
+                    and candidate not in self_atari
+                    and not is_point_an_eye(board, candidate, player)
+                ):
+                    candidates.append(candidate)
+        move = self._first_valid(game_state, candidates)
+        if move:
+            return move
+        return Move.pass_turn()
+
+    @staticmethod
+    def _first_valid(game_state: GameState, points: Iterable[Point]) -> Optional[Move]:
+        # checking legality is the expensive part, so only check until we
+        # find a move rather than filtering the whole list
+        points = list(points)
+        random.shuffle(points)
+        for point in points:
+            move = Move.play(point)
+            if game_state.is_valid_move(move):
+                return move
+        return None
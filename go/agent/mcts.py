@@ -1,10 +1,82 @@
+from collections import Counter
 import math
+from typing import Dict, List, Optional, Tuple, Union
 
 from go.agent.base import Agent
+from go.agent.heuristic import HeuristicBot
 from go.agent.naive import RandomBot
+from go.agent.pattern import PatternBot
 from go.goboard import GameState
-from go.gotypes import Player, Move
-from go.mcts import MCTSNode
+from go.gotypes import Player, Move, Point
+from go.mcts import DEFAULT_MAX_STATES, MCTSNode
+from go.mcts_pool import MCTSNodePool, PooledNode
+from go.scoring import estimate_winner
+
+# MCTSAgent can keep its tree either as a graph of MCTSNode objects or packed
+# into an MCTSNodePool; the agent only talks to the node interface they share
+Node = Union[MCTSNode, PooledNode]
+TREE_BACKENDS = ("node", "pool")
+
+# the bots that can play out rollouts
+ROLLOUT_POLICIES = {
+    "random": RandomBot,
+    "heuristic": HeuristicBot,
+    "pattern": PatternBot,
+}
+
+# once a tree hits max_nodes it's pruned down to this fraction of it, so that
+# we aren't walking the whole tree to prune after every round
+PRUNE_TO = 0.9
+
+
+class SearchStats:
+    """what a single select_move call got up to"""
+
+    def __init__(self):
+        self.rounds = 0
+        self.rounds_saved = 0
+        self.nodes_allocated = 0
+        self.nodes_pruned = 0
+        self.nodes_alive = 0
+        # rollout length in moves -> number of rollouts that long
+        self.rollout_lengths: Counter = Counter()
+        self.rollouts_capped = 0
+
+    def rollout_histogram(self, bin_width: int = 10) -> List[Tuple[int, int]]:
+        """rollout lengths bucketed into (bin start, count) pairs"""
+        bins: Counter = Counter()
+        for length, count in self.rollout_lengths.items():
+            bins[length - length % bin_width] += count
+        return sorted(bins.items())
+
+    def mean_rollout_length(self) -> float:
+        total = sum(self.rollout_lengths.values())
+        if not total:
+            return 0.0
+        moves = sum(length * count for length, count in self.rollout_lengths.items())
+        return moves / total
+
+    def rollout_percentile(self, q: float) -> int:
+        """the shortest length that at least a fraction q of rollouts fit in"""
+        total = sum(self.rollout_lengths.values())
+        seen = 0
+        for length in sorted(self.rollout_lengths):
+            seen += self.rollout_lengths[length]
+            if seen >= q * total:
+                return length
+        return 0
+
+    def __str__(self) -> str:
+        longest = max(self.rollout_lengths, default=0)
+        return (
+            f"{self.rounds} rounds ({self.rounds_saved} saved), "
+            f"{self.nodes_allocated} nodes allocated, "
+            f"{self.nodes_pruned} pruned, {self.nodes_alive} alive, "
+            f"rollouts {self.mean_rollout_length():.1f} moves on average, "
+            f"median {self.rollout_percentile(0.5)}, "
+            f"90th percentile {self.rollout_percentile(0.9)}, "
+            f"longest {longest} ({self.rollouts_capped} capped)"
+        )
 
 
 def uct_score(parent_rollouts, child_rollouts, win_pct, temperature):
@@ -12,52 +84,181 @@ def uct_score(parent_rollouts, child_rollouts, win_pct, temperature):
     return win_pct + temperature * exploration
 
 
+def rave_beta(child_rollouts: int, equivalence: float) -> float:
+    """rave_beta:
+    How much weight the AMAF value gets against a child's own win rate.
+
+    This is the "hand-selected schedule" from Gelly & Silver: the AMAF value
+    counts for half at `equivalence` rollouts and fades out after that.
+    """
+    return math.sqrt(equivalence / (3 * child_rollouts + equivalence))
+
+
 class MCTSAgent(Agent):
-    def __init__(self, num_rounds: int, temperature: float):
+    def __init__(
+        self,
+        num_rounds: int,
+        temperature: float,
+        tree: str = "node",
+        max_states: int = DEFAULT_MAX_STATES,
+        max_nodes: Optional[int] = None,
+        rave: bool = False,
+        rave_equivalence: float = 1000.0,
+        early_stop: bool = False,
+        early_stop_confidence: Optional[float] = None,
+        max_rollout_moves: Optional[int] = None,
+        rollout_policy: str = "random",
+    ):
         Agent.__init__(self)
+        if tree not in TREE_BACKENDS:
+            raise ValueError(f"unknown tree backend {tree!r}")
+        if rollout_policy not in ROLLOUT_POLICIES:
+            raise ValueError(f"unknown rollout policy {rollout_policy!r}")
+        # pruning always leaves the root and at least one child; it keeps the
+        # most-visited child and the best-scoring one, so it can overshoot a
+        # cap of 2 by one
+        if max_nodes is not None and max_nodes < 2:
+            raise ValueError(f"max_nodes has to be at least 2, not {max_nodes}")
         self.num_rounds = num_rounds
         self.temperature = temperature
+        self.tree = tree
+        # how many game states the tree may keep materialized, see go.mcts
+        self.max_states = max_states
+        # cap on live tree nodes; past it the coldest subtrees get pruned
+        self.max_nodes = max_nodes
+        # blend all-moves-as-first values into selection, see rave_beta
+        self.rave = rave
+        self.rave_equivalence = rave_equivalence
+        # stop searching once the move we'd pick can't change any more, see
+        # move_is_decided
+        self.early_stop = early_stop
+        self.early_stop_confidence = early_stop_confidence
+        # rollouts that go on longer than this are scored by estimate_winner
+        # instead of being played out
+        self.max_rollout_moves = max_rollout_moves
+        self.rollout_policy = rollout_policy
+        self.last_stats = SearchStats()
+
+    def new_root(self, game_state: GameState) -> Node:
+        if self.tree == "pool":
+            return MCTSNodePool(game_state, max_states=self.max_states).root
+        return MCTSNode(game_state, max_states=self.max_states)
 
     def select_move(self, game_state: GameState) -> Move:
-        root = MCTSNode(game_state)
+        root = self.new_root(game_state)
+        tree = root.tree
+        stats = self.last_stats = SearchStats()
+
+        for i in range(self.num_rounds):
+            if self.early_stop and self.move_is_decided(
+                root, game_state.next_player, self.num_rounds - i
+            ):
+                stats.rounds_saved = self.num_rounds - i
+                break
 
-        for _ in range(self.num_rounds):
             node = root
+            path = [node]
             while (not node.can_add_child()) and (not node.is_terminal()):
                 node = self.select_child(node)
+                path.append(node)
 
             if node.can_add_child():
                 node = node.add_random_child()
+                path.append(node)
 
-            winner = self.simulate_random_game(node.game_state)
+            rollout_moves: Optional[List[Move]] = [] if self.rave else None
+            winner = self.simulate_random_game(node.game_state, rollout_moves)
+            if rollout_moves is not None:
+                self.record_amaf(path, rollout_moves, winner)
 
             while node is not None:
                 node.record_win(winner)
                 node = node.parent
 
-            best_move = None
-            best_pct = -1.0
-            for child in root.children:
-                child_pct = child.winning_frac(game_state.next_player)
-                if child_pct > best_pct:
-                    best_pct = child_pct
-                    best_move = child.move
+            stats.rounds += 1
+            if self.max_nodes is not None and tree.num_alive > self.max_nodes:
+                tree.prune(int(self.max_nodes * PRUNE_TO))
+
+        stats.nodes_allocated = tree.num_allocated
+        stats.nodes_pruned = tree.num_pruned
+        stats.nodes_alive = tree.num_alive
+
+        # this used to live inside the loop above, which meant we returned
+        # after a single round
+        best_move = None
+        best_pct = -1.0
+        for child in root.children:
+            child_pct = child.winning_frac(game_state.next_player)
+            if child_pct > best_pct:
+                best_pct = child_pct
+                best_move = child.move
+
+        assert best_move
+        return best_move
+
+    def move_is_decided(self, root: Node, player: Player, rounds_left: int) -> bool:
+        """move_is_decided:
+        True if no amount of searching in the rounds we have left could
+        change which child select_move picks.
 
-            assert best_move
-            return best_move
+        We pick the child with the best winning fraction, so it's safe once
+        even the most optimistic outcome for every other child (winning every
+        remaining round) can't get past the most pessimistic one for the
+        leader (losing every remaining round). If early_stop_confidence is
+        set we'll also settle for the leader's Hoeffding lower bound clearing
+        everybody else's upper bound at that confidence.
+        """
+        # any move we haven't tried yet could come out on top
+        if root.can_add_child():
+            return False
+        children = root.children
+        if len(children) < 2:
+            return True
 
-        raise ValueError("unreachable code")
+        leader = max(children, key=lambda child: child.winning_frac(player))
+        leader_wins = leader.winning_frac(player) * leader.num_rollouts
+        worst_case = leader_wins / (leader.num_rollouts + rounds_left)
+        if all(
+            (child.winning_frac(player) * child.num_rollouts + rounds_left)
+            / (child.num_rollouts + rounds_left)
+            < worst_case
+            for child in children
+            if child is not leader
+        ):
+            return True
 
-    def select_child(self, node: MCTSNode) -> MCTSNode:
-        total_rollouts = sum(child.num_rollouts for child in node.children)
+        if self.early_stop_confidence is None:
+            return False
+
+        # Hoeffding: P(true value > observed + b) <= exp(-2 n b^2)
+        log_delta = math.log(1 / (1 - self.early_stop_confidence))
+
+        def bound(child: Node) -> float:
+            return math.sqrt(log_delta / (2 * child.num_rollouts))
+
+        leader_low = leader.winning_frac(player) - bound(leader)
+        return all(
+            child.winning_frac(player) + bound(child) < leader_low
+            for child in children
+            if child is not leader
+        )
+
+    def select_child(self, node: Node) -> Node:
+        children = node.children
+        total_rollouts = sum(child.num_rollouts for child in children)
 
         best_score: float = -1.0
         best_child = None
-        for child in node.children:
+        for child in children:
+            win_pct = child.winning_frac(node.next_player)
+            if self.rave and child.amaf_rollouts:
+                beta = rave_beta(child.num_rollouts, self.rave_equivalence)
+                amaf_pct = child.amaf_winning_frac(node.next_player)
+                win_pct = (1 - beta) * win_pct + beta * amaf_pct
             score = uct_score(
                 total_rollouts,
                 child.num_rollouts,
-                child.winning_frac(node.game_state.next_player),
+                win_pct,
                 self.temperature,
             )
             if score > best_score:
@@ -68,12 +269,61 @@ class MCTSAgent(Agent):
         return best_child
 
     @staticmethod
-    def simulate_random_game(game) -> Player:
+    def record_amaf(path: List[Node], rollout_moves: List[Move], winner: Player):
+        """record_amaf:
+        Credit the rollout's result to every child, anywhere along the path,
+        whose point the player to move there went on to play later in the
+        round, either further down the tree or in the rollout, before the
+        other player did.
+        """
+        # who played each point first after the node we're looking at. This
+        # is built up from the end of the round backwards, so each play
+        # overwrites any later play of the same point, and only the first
+        # one gets the credit
+        first_played: Dict[Point, Player] = {}
+        plays = []
+        player = path[-1].next_player
+        for move in rollout_moves:
+            if move.is_play:
+                assert move.point
+                plays.append((move.point, player))
+            player = player.other
+        for point, player in reversed(plays):
+            first_played[point] = player
+
+        for node in reversed(path):
+            for child in node.children:
+                move = child.move
+                assert move
+                if move.point is not None and (
+                    first_played.get(move.point) == node.next_player
+                ):
+                    child.record_amaf(winner)
+            move = node.move
+            if move is not None and move.is_play:
+                assert move.point
+                first_played[move.point] = node.next_player.other
+
+    def simulate_random_game(
+        self, game: GameState, moves: Optional[List[Move]] = None
+    ) -> Player:
+        policy = ROLLOUT_POLICIES[self.rollout_policy]
         bots = {
-            Player.black: RandomBot(),
-            Player.white: RandomBot(),
+            Player.black: policy(),
+            Player.white: policy(),
         }
+        num_moves = 0
         while not game.is_over():
+            if num_moves == self.max_rollout_moves:
+                self.last_stats.rollout_lengths[num_moves] += 1
+                self.last_stats.rollouts_capped += 1
+                return estimate_winner(game.board)
             bot_move = bots[game.next_player].select_move(game)
+            if moves is not None:
+                moves.append(bot_move)
             game = game.apply_move(bot_move)
-        return game.winner()
+            num_moves += 1
+        self.last_stats.rollout_lengths[num_moves] += 1
+        winner = game.winner()
+        assert winner
+        return winner
@@ -0,0 +1,202 @@
+import asyncio
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from go.agent.mcts import MCTSAgent, SearchStats
+from go.encoders.encoder import Encoder
+from go.goboard import GameState
+from go.gotypes import Move
+from go.nn.evaluator import BatchedEvaluator
+
+
+class NNMCTSNode:
+    __slots__ = (
+        "game_state",
+        "parent",
+        "move",
+        "prior",
+        "num_visits",
+        "value_sum",
+        "children",
+        "pending",
+        "next_player",
+    )
+
+    def __init__(
+        self,
+        game_state: Optional[GameState],
+        parent: Optional["NNMCTSNode"] = None,
+        move: Optional[Move] = None,
+        prior: float = 1.0,
+    ):
+        # children don't get a state until a search first walks into them
+        self.game_state = game_state
+        self.parent = parent
+        self.move = move
+        self.prior = prior
+        if parent is None:
+            assert game_state
+            self.next_player = game_state.next_player
+        else:
+            self.next_player = parent.next_player.other
+        # visits include virtual losses from searches that are still in
+        # flight, which count as visits we lost
+        self.num_visits = 0
+        # wins for the player who made `move`
+        self.value_sum = 0.0
+        self.children: List["NNMCTSNode"] = []
+        # set while a search is waiting on the network to expand this node
+        self.pending: Optional[asyncio.Event] = None
+
+    def is_expanded(self) -> bool:
+        return len(self.children) > 0
+
+    def value(self) -> float:
+        if self.num_visits == 0:
+            return 0.0
+        return self.value_sum / self.num_visits
+
+
+class NNMCTSAgent(MCTSAgent):
+    """NNMCTSAgent:
+    MCTS guided by a move-prediction network, like the ones you can train on
+    the output of generate_mcts_games.py.
+
+    The network's output over encoder.num_points() is used as priors for a
+    PUCT-style selection, and leaves are still valued with rollouts. The
+    rollouts are all it shares with MCTSAgent, so max_rollout_moves and
+    rollout_policy are the only MCTSAgent settings it takes; tree options
+    like node caps, RAVE and early stopping don't apply to this search.
+
+    `num_workers` searches run at once as asyncio tasks; virtual loss steers
+    them onto different leaves, and all the leaves they're waiting on are
+    evaluated in one forward pass by a BatchedEvaluator.
+    """
+
+    def __init__(
+        self,
+        model,
+        encoder: Encoder,
+        num_rounds: int,
+        temperature: float = 1.5,
+        num_workers: int = 16,
+        max_batch_size: int = 16,
+        max_wait: float = 0.001,
+        virtual_loss: int = 1,
+        max_rollout_moves: Optional[int] = None,
+        rollout_policy: str = "random",
+    ):
+        MCTSAgent.__init__(
+            self,
+            num_rounds,
+            temperature,
+            max_rollout_moves=max_rollout_moves,
+            rollout_policy=rollout_policy,
+        )
+        self.model = model
+        self.encoder = encoder
+        self.num_workers = num_workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.virtual_loss = virtual_loss
+        self.num_batches = 0
+        self.num_evaluations = 0
+
+    def select_move(self, game_state: GameState) -> Move:
+        self.last_stats = SearchStats()
+        root = NNMCTSNode(game_state)
+        asyncio.run(self._search(root))
+
+        # no rounds, or nothing to expand because the game is already over
+        if not root.children:
+            return Move.pass_turn()
+        best = max(root.children, key=lambda child: child.num_visits)
+        assert best.move
+        return best.move
+
+    async def _search(self, root: NNMCTSNode):
+        async with BatchedEvaluator(
+            self.model, self.max_batch_size, self.max_wait
+        ) as evaluator:
+            rounds_left = [self.num_rounds]
+
+            async def worker():
+                while rounds_left[0] > 0:
+                    rounds_left[0] -= 1
+                    await self._search_once(root, evaluator)
+
+            await asyncio.gather(*(worker() for _ in range(self.num_workers)))
+            self.num_batches = evaluator.num_batches
+            self.num_evaluations = evaluator.num_requests
+
+    async def _search_once(self, root: NNMCTSNode, evaluator: BatchedEvaluator):
+        node = root
+        path = [node]
+        while True:
+            if node.pending is not None:
+                # somebody else is already expanding this one
+                await node.pending.wait()
+            game_state = node.game_state
+            assert game_state
+            if not node.is_expanded() or game_state.is_over():
+                break
+            node = self.select_puct_child(node)
+            if node.game_state is None:
+                assert node.move
+                node.game_state = game_state.apply_move(node.move)
+            path.append(node)
+            node.num_visits += self.virtual_loss
+
+        game_state = node.game_state
+        assert game_state is not None
+        if not game_state.is_over() and not node.is_expanded():
+            node.pending = asyncio.Event()
+            try:
+                priors = await evaluator.evaluate(self.encoder.encode(game_state))
+                self.expand(node, priors)
+            finally:
+                node.pending.set()
+                node.pending = None
+
+        winner = self.simulate_random_game(game_state)
+        self.last_stats.rounds += 1
+
+        for i, node in enumerate(path):
+            if i > 0:
+                node.num_visits -= self.virtual_loss
+            node.num_visits += 1
+            # the parent's next player is whoever made this node's move
+            if node.parent is not None and winner == node.parent.next_player:
+                node.value_sum += 1
+
+    def expand(self, node: NNMCTSNode, priors: np.ndarray):
+        assert node.game_state
+        # the network's priors are in encoder point order, same as the mask
+        mask = node.game_state.legal_mask()
+        weights = np.maximum(np.ravel(priors), 0)[mask]
+        # passing isn't something the network predicts, so it gets an
+        # average prior
+        pass_prior = float(weights.mean()) if weights.size else 1.0
+        total = float(weights.sum()) + pass_prior or 1.0
+        for index, weight in zip(np.flatnonzero(mask), weights):
+            move = Move.play(self.encoder.decode_point_index(int(index)))
+            node.children.append(NNMCTSNode(None, node, move, float(weight) / total))
+        node.children.append(
+            NNMCTSNode(None, node, Move.pass_turn(), pass_prior / total)
+        )
+
+    def select_puct_child(self, node: NNMCTSNode) -> NNMCTSNode:
+        sqrt_visits = math.sqrt(max(node.num_visits, 1))
+        best_score = -math.inf
+        best_child = None
+        for child in node.children:
+            score = child.value() + self.temperature * child.prior * sqrt_visits / (
+                1 + child.num_visits
+            )
+            if score > best_score:
+                best_score = score
+                best_child = child
+        assert best_child
+        return best_child
@@ -0,0 +1,94 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from go.agent.nn_mcts import NNMCTSAgent
+from go.encoders.multiplane import MultiPlaneEncoder
+from go.encoders.plane import OnePlaneEncoder
+from go.goboard import GameState
+from go.gotypes import Move
+from go.nn.evaluator import BatchedEvaluator
+from go.nn.layer import ActivationLayer, DenseLayer, SequentialNetwork
+from go.utils import point_from_coords
+
+
+class UniformModel:
+    """a stand-in network: the same prior for every point"""
+
+    def __init__(self, num_points: int):
+        self.num_points = num_points
+        self.batch_sizes = []
+
+    def single_forward(self, x):
+        self.batch_sizes.append(x.shape[1])
+        return np.ones((self.num_points, x.shape[1]))
+
+
+def test_search_returns_legal_move():
+    random.seed(0)
+    encoder = OnePlaneEncoder(5)
+    model = UniformModel(encoder.num_points())
+    agent = NNMCTSAgent(
+        model, encoder, num_rounds=12, num_workers=4, max_rollout_moves=20
+    )
+    game = GameState.new_game(5)
+    move = agent.select_move(game)
+    assert game.is_valid_move(move)
+    assert agent.last_stats.rounds == 12
+    # every leaf that got expanded went through the network exactly once
+    assert sum(model.batch_sizes) == agent.num_evaluations
+    assert agent.num_batches == len(model.batch_sizes)
+
+
+def test_no_rounds_passes():
+    encoder = OnePlaneEncoder(5)
+    agent = NNMCTSAgent(UniformModel(encoder.num_points()), encoder, num_rounds=0)
+    assert agent.select_move(GameState.new_game(5)).is_pass
+
+
+def test_rejects_options_it_does_not_use():
+    encoder = OnePlaneEncoder(5)
+    model = UniformModel(encoder.num_points())
+    with pytest.raises(TypeError):
+        NNMCTSAgent(model, encoder, num_rounds=1, max_nodes=10)  # type: ignore
+
+
+def make_network(num_inputs: int, num_points: int) -> SequentialNetwork:
+    np.random.seed(3)
+    net = SequentialNetwork()
+    net.add(DenseLayer(num_inputs, 32))
+    net.add(ActivationLayer(32, "relu"))
+    net.add(DenseLayer(32, num_points))
+    net.add(ActivationLayer(num_points))
+    return net
+
+
+def test_real_network_through_evaluator_and_search():
+    for encoder in [OnePlaneEncoder(5), MultiPlaneEncoder(5)]:
+        num_inputs = int(np.prod(encoder.shape()))
+        net = make_network(num_inputs, encoder.num_points())
+
+        # batched results match running the whole batch through the network
+        states = [GameState.new_game(5)]
+        for move in ["C3", "D4", "B2"]:
+            states.append(states[-1].apply_move(Move.play(point_from_coords(move))))
+        xs = [encoder.encode(state) for state in states]
+
+        async def run():
+            async with BatchedEvaluator(net, max_batch_size=4, max_wait=1) as ev:
+                return await asyncio.gather(*(ev.evaluate(x) for x in xs))
+
+        results = asyncio.run(run())
+        expected = net.single_forward(np.stack([x.reshape(-1) for x in xs], axis=1))
+        for i, result in enumerate(results):
+            assert result.shape == (encoder.num_points(),)
+            assert np.allclose(result, expected[:, i])
+
+        random.seed(2)
+        agent = NNMCTSAgent(
+            net, encoder, num_rounds=8, num_workers=4, max_rollout_moves=20
+        )
+        game = states[-1]
+        assert game.is_valid_move(agent.select_move(game))
@@ -0,0 +1,135 @@
+import random
+from typing import Dict, Optional
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.agent.base import Agent
+from go.goboard import (
+    GameState,
+    NUM_PATTERNS,
+    PATTERN_ATARI_SHIFT,
+    PATTERN_BLACK,
+    PATTERN_EDGE,
+    PATTERN_ORTHOGONAL,
+    PATTERN_WHITE,
+)
+from go.gotypes import Move, Player
+
+# multipliers for the default weight table
+CAPTURE_WEIGHT = 20.0
+ESCAPE_WEIGHT = 5.0
+
+# weights are only ever compared against each other, so float32 is plenty and
+# keeps each table (one per player) at 4MB rather than 8
+WEIGHT_DTYPE = np.float32
+
+# diagonal positions in go.goboard.PATTERN_OFFSETS
+PATTERN_DIAGONAL = [0, 2, 5, 7]
+
+
+def _neighbor_colors(codes: nptype.NDArray[np.int64], i: int):
+    return (codes >> (2 * i)) & 3
+
+
+def swap_colors(codes: nptype.NDArray[np.int64]) -> nptype.NDArray[np.int64]:
+    """the pattern codes you'd get with black and white swapped"""
+    swapped = codes & ~((1 << PATTERN_ATARI_SHIFT) - 1)
+    for i in range(8):
+        color = _neighbor_colors(codes, i)
+        color = np.where(
+            color == PATTERN_BLACK,
+            PATTERN_WHITE,
+            np.where(color == PATTERN_WHITE, PATTERN_BLACK, color),
+        )
+        swapped |= color << (2 * i)
+    return swapped
+
+
+def default_pattern_weights() -> nptype.NDArray[np.float32]:
+    """default_pattern_weights:
+    Weights for every pattern code, from black's point of view.
+
+    Everything starts at 1. Captures and escapes from atari get boosted, and
+    our own eyes are never played. A trained table can be dropped in
+    instead.
+    """
+    codes = np.arange(NUM_PATTERNS, dtype=np.int64)
+    weights = np.ones(NUM_PATTERNS, dtype=WEIGHT_DTYPE)
+
+    own = np.ones(NUM_PATTERNS, dtype=bool)
+    for bit, i in enumerate(PATTERN_ORTHOGONAL):
+        color = _neighbor_colors(codes, i)
+        in_atari = (codes >> (PATTERN_ATARI_SHIFT + bit)) & 1 == 1
+        weights[in_atari & (color == PATTERN_WHITE)] *= CAPTURE_WEIGHT
+        weights[in_atari & (color == PATTERN_BLACK)] *= ESCAPE_WEIGHT
+        own &= (color == PATTERN_BLACK) | (color == PATTERN_EDGE)
+
+    # like an eye in go.agent.helpers: on the edge every corner on the board
+    # has to be ours, in the middle three out of four will do
+    friendly_corners = np.zeros(NUM_PATTERNS, dtype=np.int64)
+    off_board_corners = np.zeros(NUM_PATTERNS, dtype=np.int64)
+    for i in PATTERN_DIAGONAL:
+        color = _neighbor_colors(codes, i)
+        friendly_corners += color == PATTERN_BLACK
+        off_board_corners += color == PATTERN_EDGE
+    eye = own & np.where(
+        off_board_corners > 0,
+        off_board_corners + friendly_corners == 4,
+        friendly_corners >= 3,
+    )
+    weights[eye] = 0
+    return weights
+
+
+# building the default tables takes a moment, and rollouts make a new bot
+# every game, so they're built once and shared
+_default_weights: Optional[Dict[Player, nptype.NDArray[np.float32]]] = None
+
+
+def _weights_by_player(
+    weights: Optional[nptype.NDArray[np.float32]],
+) -> Dict[Player, nptype.NDArray[np.float32]]:
+    global _default_weights
+    if weights is None:
+        if _default_weights is None:
+            _default_weights = _weights_by_player(default_pattern_weights())
+        return _default_weights
+    weights = np.asarray(weights, dtype=WEIGHT_DTYPE)
+    codes = np.arange(NUM_PATTERNS, dtype=np.int64)
+    return {
+        Player.black: weights,
+        Player.white: weights[swap_colors(codes)],
+    }
+
+
+class PatternBot(Agent):
+    """PatternBot:
+    A rollout policy that samples empty points in proportion to the weight
+    of their 3x3 pattern, which the board keeps up to date as stones come and
+    go. `weights` is indexed by pattern code from black's point of view;
+    white's table is derived from it by swapping colors.
+    """
+
+    def __init__(self, weights: Optional[nptype.NDArray[np.float32]] = None):
+        Agent.__init__(self)
+        self.weights = _weights_by_player(weights)
+
+    def select_move(self, game_state: GameState) -> Move:
+        patterns = game_state.board.patterns()
+        points = list(patterns)
+        codes = np.fromiter(patterns.values(), dtype=np.int64, count=len(points))
+        weights = self.weights[game_state.next_player][codes]
+
+        while True:
+            cumulative = np.cumsum(weights)
+            if not len(cumulative) or cumulative[-1] <= 0:
+                return Move.pass_turn()
+            i = int(
+                np.searchsorted(cumulative, random.random() * cumulative[-1], "right")
+            )
+            i = min(i, len(points) - 1)
+            move = Move.play(points[i])
+            if game_state.is_valid_move(move):
+                return move
+            weights[i] = 0
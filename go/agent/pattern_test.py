@@ -0,0 +1,38 @@
+import random
+
+import numpy as np
+
+from go.agent.pattern import PatternBot, default_pattern_weights
+from go.goboard import NUM_PATTERNS, GameState
+from go.gotypes import Move, Player, Point
+
+
+def test_plays_legal_moves():
+    random.seed(0)
+    bot = PatternBot()
+    game = GameState.new_game(5)
+    for _ in range(30):
+        if game.is_over():
+            break
+        move = bot.select_move(game)
+        assert game.is_valid_move(move)
+        game = game.apply_move(move)
+    assert default_pattern_weights().dtype == np.float32
+
+
+def test_prefers_higher_weighted_patterns():
+    game = GameState.new_game(5)
+    game = game.apply_move(Move.play(Point(3, 3)))
+    game = game.apply_move(Move.pass_turn())
+    patterns = game.board.patterns()
+    target = patterns[Point(3, 4)]
+    assert list(patterns.values()).count(target) == 1
+
+    # every other pattern still has a small chance of being picked
+    weights = np.full(NUM_PATTERNS, 1e-6)
+    weights[target] = 1.0
+    bot = PatternBot(weights)
+    assert game.next_player == Player.black
+    random.seed(1)
+    for _ in range(20):
+        assert bot.select_move(game).point == Point(3, 4)
@@ -0,0 +1,84 @@
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.data.shards import Fields, read_manifest
+from go.encoders.encoder import Encoder
+
+# Every encoder we have produces small integers, and a move is just a point
+# index, so that's all we store: a 19x19 sample is ~1.4KB of int8 planes and
+# one int16 label, rather than float64 planes and a float64 one-hot vector.
+# Samples only become floats a mini-batch at a time, in expand_batch.
+BOARD_DTYPE = np.int8
+MOVE_DTYPE = np.int16
+
+Batch = Tuple[nptype.NDArray, nptype.NDArray]
+
+
+def compact_fields(encoder: Encoder) -> Fields:
+    """the ShardWriter fields for boards encoded by `encoder`"""
+    return {
+        "boards": (encoder.shape(), BOARD_DTYPE),
+        "moves": ((), MOVE_DTYPE),
+    }
+
+
+def open_shards(directory: str) -> List[Dict[str, np.ndarray]]:
+    """every shard in a ShardWriter directory, memory-mapped read-only"""
+    manifest = read_manifest(directory)
+    shards = []
+    for shard in manifest["shards"]:
+        shards.append(
+            {
+                name: np.load(os.path.join(directory, shard[name]), mmap_mode="r")[
+                    : shard["size"]
+                ]
+                for name in manifest["fields"]
+            }
+        )
+    return shards
+
+
+def expand_batch(
+    boards: nptype.NDArray,
+    moves: nptype.NDArray,
+    dtype: nptype.DTypeLike = np.float32,
+) -> Batch:
+    """expand_batch:
+    Turn compact boards and move indices into float boards and one-hot move
+    targets, which is what the networks train on.
+    """
+    x = boards.astype(dtype)
+    num_points = boards.shape[-1] * boards.shape[-2]
+    y = np.zeros((len(moves), num_points), dtype=dtype)
+    y[np.arange(len(moves)), moves] = 1
+    return x, y
+
+
+def minibatches(
+    directory: str,
+    batch_size: int,
+    shuffle: bool = True,
+    dtype: nptype.DTypeLike = np.float32,
+    rng: Optional[np.random.Generator] = None,
+) -> Iterator[Batch]:
+    """minibatches:
+    One pass over a compact dataset, a mini-batch at a time. Shuffling is
+    done by shard and then within each shard, so we only ever read from one
+    memory-mapped shard at a time.
+    """
+    rng = rng or np.random.default_rng()
+    shards = open_shards(directory)
+    if shuffle:
+        shards = [shards[i] for i in rng.permutation(len(shards))]
+    for shard in shards:
+        boards, moves = shard["boards"], shard["moves"]
+        if shuffle:
+            order = rng.permutation(len(moves))
+        else:
+            order = np.arange(len(moves))
+        for start in range(0, len(order), batch_size):
+            index = order[start : start + batch_size]
+            yield expand_batch(boards[index], moves[index], dtype)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from go.data.compact import compact_fields, minibatches
+from go.data.shards import ShardWriter
+from go.encoders.plane import OnePlaneEncoder
+
+
+def test_minibatches_expand_compact_samples(tmp_path):
+    encoder = OnePlaneEncoder(3)
+    directory = str(tmp_path / "games")
+    moves = np.arange(9, dtype=np.int16)
+    boards = np.zeros((9, 1, 3, 3), dtype=np.int8)
+    # mark each board with its own move so we can match them up afterwards
+    boards.reshape(9, 9)[np.arange(9), moves] = -1
+    with ShardWriter(directory, compact_fields(encoder), shard_size=4) as writer:
+        writer.append(boards=boards, moves=moves)
+
+    seen = []
+    for x, y in minibatches(directory, 3, rng=np.random.default_rng(0)):
+        assert x.dtype == y.dtype == np.float32
+        assert len(x) <= 3
+        assert np.array_equal(x.reshape(len(x), 9), -y)
+        seen.extend(np.argmax(y, axis=1))
+    assert sorted(seen) == list(range(9))
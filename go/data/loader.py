@@ -0,0 +1,158 @@
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.data.compact import expand_batch, open_shards
+
+Batch = Tuple[nptype.NDArray, nptype.NDArray]
+
+# how many batches the loader keeps ready ahead of the training loop
+DEFAULT_PREFETCH = 4
+
+
+class Dataset:
+    """anything that can hand out samples by index, a batch at a time"""
+
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+    def batch(self, indices: nptype.NDArray[np.intp], dtype: nptype.DTypeLike) -> Batch:
+        raise NotImplementedError()
+
+
+class ArrayDataset(Dataset):
+    """ArrayDataset:
+    Features and labels in a pair of arrays, typically opened with
+    np.load(..., mmap_mode="r") so they never have to fit in memory. If
+    num_classes is given the labels are class indices (like the move indices
+    generate_mcts_games.py saves) and get one-hot encoded per batch.
+    """
+
+    def __init__(
+        self,
+        features: nptype.NDArray,
+        labels: nptype.NDArray,
+        num_classes: Optional[int] = None,
+    ):
+        assert len(features) == len(labels)
+        self.features = features
+        self.labels = labels
+        self.num_classes = num_classes
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def batch(self, indices: nptype.NDArray[np.intp], dtype: nptype.DTypeLike) -> Batch:
+        x = self.features[indices].astype(dtype)
+        if self.num_classes is None:
+            return x, self.labels[indices].astype(dtype)
+        y = np.zeros((len(indices), self.num_classes), dtype=dtype)
+        y[np.arange(len(indices)), self.labels[indices]] = 1
+        return x, y
+
+
+class ShardDataset(Dataset):
+    """the compact shards in a ShardWriter directory, see go.data.compact"""
+
+    def __init__(self, directory: str):
+        self.shards = open_shards(directory)
+        sizes = [len(shard["moves"]) for shard in self.shards]
+        # starts[i] is the index of the first sample in shard i
+        self.starts = np.concatenate([[0], np.cumsum(sizes, dtype=np.intp)])
+
+    def __len__(self) -> int:
+        return int(self.starts[-1])
+
+    def batch(self, indices: nptype.NDArray[np.intp], dtype: nptype.DTypeLike) -> Batch:
+        which = np.searchsorted(self.starts, indices, side="right") - 1
+        boards, moves = [], []
+        for shard in np.unique(which):
+            offsets = indices[which == shard] - self.starts[shard]
+            boards.append(self.shards[shard]["boards"][offsets])
+            moves.append(self.shards[shard]["moves"][offsets])
+        return expand_batch(np.concatenate(boards), np.concatenate(moves), dtype)
+
+
+class DataLoader:
+    """DataLoader:
+    Iterates over a Dataset in mini-batches, one epoch per iteration.
+
+    Shuffling permutes an index array rather than the samples themselves,
+    and the indices inside a batch are sorted so that reads from memory-mapped
+    files go forward through them. Batches are put together on a background
+    thread up to `prefetch` ahead of whoever is consuming them; reading a
+    memory map and numpy's copies let go of the GIL, so that overlaps with
+    training rather than waiting on it.
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        batch_size: int,
+        shuffle: bool = True,
+        prefetch: int = DEFAULT_PREFETCH,
+        dtype: nptype.DTypeLike = np.float32,
+        rng: Optional[np.random.Generator] = None,
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self.dtype = dtype
+        self.rng = rng or np.random.default_rng()
+
+    def __len__(self) -> int:
+        """the number of batches in an epoch"""
+        return -(-len(self.dataset) // self.batch_size)
+
+    def _batch_indices(self) -> List[nptype.NDArray[np.intp]]:
+        n = len(self.dataset)
+        order = self.rng.permutation(n) if self.shuffle else np.arange(n)
+        return [
+            np.sort(order[start : start + self.batch_size])
+            for start in range(0, n, self.batch_size)
+        ]
+
+    def __iter__(self) -> Iterator[Batch]:
+        batches = self._batch_indices()
+        if self.prefetch <= 0:
+            for indices in batches:
+                yield self.dataset.batch(indices, self.dtype)
+            return
+
+        ready: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for indices in batches:
+                    if stop.is_set():
+                        return
+                    ready.put(self.dataset.batch(indices, self.dtype))
+            except BaseException as e:
+                ready.put(e)
+                return
+            ready.put(done)
+
+        worker = threading.Thread(target=produce, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # if the consumer stops early, unblock the worker and let it go
+            stop.set()
+            while worker.is_alive():
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    worker.join(0.01)
@@ -0,0 +1,33 @@
+import numpy as np
+
+from go.data.compact import compact_fields
+from go.data.loader import ArrayDataset, DataLoader, ShardDataset
+from go.data.shards import ShardWriter
+from go.encoders.plane import OnePlaneEncoder
+
+
+def test_loader_covers_every_sample_once(tmp_path):
+    directory = str(tmp_path / "games")
+    moves = np.arange(9, dtype=np.int16)
+    boards = np.zeros((9, 1, 3, 3), dtype=np.int8)
+    boards.reshape(9, 9)[np.arange(9), moves] = 1
+    with ShardWriter(directory, compact_fields(OnePlaneEncoder(3)), 4) as writer:
+        writer.append(boards=boards, moves=moves)
+
+    for dataset in (
+        ShardDataset(directory),
+        ArrayDataset(boards.reshape(9, 9), moves, num_classes=9),
+    ):
+        loader = DataLoader(dataset, 4, prefetch=2, rng=np.random.default_rng(1))
+        assert len(loader) == 3
+        seen = []
+        for x, y in loader:
+            assert x.dtype == np.float32
+            assert np.array_equal(x.reshape(len(x), 9), y)
+            seen.extend(np.argmax(y, axis=1))
+        assert sorted(seen) == list(range(9))
+
+    # stopping early doesn't leave the prefetch thread hanging
+    loader = DataLoader(ShardDataset(directory), 1, prefetch=1)
+    for _ in loader:
+        break
@@ -0,0 +1,188 @@
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.data.compact import BOARD_DTYPE, MOVE_DTYPE
+from go.encoders.encoder import Encoder, get_encoder_by_name
+from go.goboard import Board, GameState
+from go.gotypes import Player, decode_move, encode_move
+
+# A game record is just the moves, as int16 codes: a row-major point index,
+# or go.gotypes' PASS and RESIGN, plus who won. That's a couple hundred
+# bytes a game, against tens of kilobytes for its encoded positions, and
+# positions get rebuilt by replaying the moves when they're needed.
+BLACK_WON = 1
+WHITE_WON = -1
+# the game was cut off before it was over
+NO_RESULT = 0
+
+# Encoded positions from one game: int8 boards, and the point index of the
+# move played from each, in the go.data.compact format
+Positions = Tuple[nptype.NDArray[np.int8], nptype.NDArray[np.int16]]
+
+
+def encode_winner(winner: Optional[Player]) -> int:
+    if winner is None:
+        return NO_RESULT
+    return BLACK_WON if winner == Player.black else WHITE_WON
+
+
+class GameRecordWriter:
+    """GameRecordWriter:
+    Collects game records and saves them to a single .npz.
+
+    With checkpoint_every set, the board after every checkpoint_every-th
+    move of each game is saved too, so GameRecords.position can start
+    replaying from there instead of from the first move.
+    """
+
+    def __init__(self, board_size: int, checkpoint_every: int = 0):
+        self.board_size = board_size
+        self.checkpoint_every = checkpoint_every
+        self.moves: List[nptype.NDArray[np.int16]] = []
+        self.winners: List[int] = []
+        self.checkpoints: List[nptype.NDArray[np.int8]] = []
+        # (game, number of moves played) for each checkpoint
+        self.checkpoint_index: List[Tuple[int, int]] = []
+
+    def add_game(self, moves: nptype.ArrayLike, winner: int):
+        codes = np.asarray(moves, dtype=MOVE_DTYPE)
+        if self.checkpoint_every:
+            game = GameState.new_game(self.board_size)
+            for i, code in enumerate(codes):
+                game = game.apply_move(decode_move(int(code), self.board_size))
+                if (i + 1) % self.checkpoint_every == 0:
+                    self.checkpoints.append(game.board.to_array())
+                    self.checkpoint_index.append((len(self.moves), i + 1))
+        self.moves.append(codes)
+        self.winners.append(winner)
+
+    def save(self, path: str):
+        lengths = [len(moves) for moves in self.moves]
+        size = self.board_size
+        np.savez(
+            path,
+            board_size=np.array(size),
+            moves=np.concatenate(self.moves or [np.zeros(0, MOVE_DTYPE)]),
+            offsets=np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+            winners=np.array(self.winners, dtype=np.int8),
+            checkpoints=np.array(self.checkpoints, dtype=np.int8).reshape(
+                (-1, size, size)
+            ),
+            checkpoint_index=np.array(self.checkpoint_index, dtype=np.int64).reshape(
+                (-1, 2)
+            ),
+        )
+
+
+class GameRecords:
+    """game records saved by GameRecordWriter"""
+
+    def __init__(self, path: str):
+        with np.load(path) as f:
+            self.board_size = int(f["board_size"])
+            self.moves = f["moves"]
+            self.offsets = f["offsets"]
+            self.winners = f["winners"]
+            self.checkpoints = f["checkpoints"]
+            self.checkpoint_index = f["checkpoint_index"]
+
+    def __len__(self) -> int:
+        return len(self.winners)
+
+    def game_moves(self, game: int) -> nptype.NDArray[np.int16]:
+        return self.moves[self.offsets[game] : self.offsets[game + 1]]
+
+    def position(self, game: int, move_number: int) -> GameState:
+        """position:
+        The game after its first move_number moves, replayed from the
+        closest checkpoint at or before it. A state that comes from a
+        checkpoint doesn't know the positions before it, so anything that
+        looks back through previous_state (superko, history planes) only
+        sees back as far as the checkpoint.
+        """
+        start = 0
+        state = GameState.new_game(self.board_size)
+        games, moves_played = self.checkpoint_index.T
+        candidates = np.flatnonzero((games == game) & (moves_played <= move_number))
+        if len(candidates):
+            i = candidates[np.argmax(moves_played[candidates])]
+            start = int(moves_played[i])
+            board = Board.from_array(self.checkpoints[i])
+            # black moves first and every move, passes included, alternates
+            next_player = Player.black if start % 2 == 0 else Player.white
+            state = GameState(board, next_player, None, None)
+        for code in self.game_moves(game)[start:move_number]:
+            state = state.apply_move(decode_move(int(code), self.board_size))
+        return state
+
+    def replay(self, game: int, encoder: Encoder) -> Positions:
+        """replay:
+        Every position in a game that led to a play, encoded, along with the
+        move played, the same samples generate_mcts_games.py would have
+        stored for it.
+        """
+        state = GameState.new_game(self.board_size, track_planes=True)
+        states = []
+        moves = []
+        for code in self.game_moves(game):
+            move = decode_move(int(code), self.board_size)
+            if move.is_play:
+                states.append(state)
+                moves.append(code)
+            state = state.apply_move(move)
+        boards = np.empty((len(states),) + encoder.shape(), dtype=BOARD_DTYPE)
+        encoder.encode_batch(states, out=boards)
+        return boards, np.array(moves, dtype=MOVE_DTYPE)
+
+
+# each worker process loads the records once and keeps them here
+_worker_records: Optional[GameRecords] = None
+_worker_encoder: Optional[Encoder] = None
+
+
+def _init_worker(path: str, encoder_name: str):
+    global _worker_records, _worker_encoder
+    _worker_records = GameRecords(path)
+    _worker_encoder = get_encoder_by_name(encoder_name, _worker_records.board_size)
+
+
+def _replay_in_worker(game: int) -> Positions:
+    assert _worker_records is not None and _worker_encoder is not None
+    return _worker_records.replay(game, _worker_encoder)
+
+
+def replay_games(
+    path: str,
+    encoder_name: str,
+    games: Optional[Sequence[int]] = None,
+    workers: int = 1,
+) -> Iterator[Positions]:
+    """replay_games:
+    The encoded positions of each of `games` (all of them by default) in
+    the records at `path`, one game at a time and in order. Replaying is
+    spread over `workers` processes if there's more than one.
+    """
+    if workers > 1:
+        with Pool(workers, _init_worker, (path, encoder_name)) as pool:
+            if games is None:
+                games = range(len(GameRecords(path)))
+            yield from pool.imap(_replay_in_worker, games, chunksize=16)
+        return
+    records = GameRecords(path)
+    encoder = get_encoder_by_name(encoder_name, records.board_size)
+    for game in range(len(records)) if games is None else games:
+        yield records.replay(game, encoder)
+
+
+def encode_moves(game_state: GameState) -> nptype.NDArray[np.int16]:
+    """every move that led to game_state, as game record codes"""
+    codes = []
+    num_cols = game_state.board.num_cols
+    state: Optional[GameState] = game_state
+    while state is not None and state.last_move is not None:
+        codes.append(encode_move(state.last_move, num_cols))
+        state = state.previous_state
+    return np.array(codes[::-1], dtype=MOVE_DTYPE)
@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+
+from go.agent.naive import RandomBot
+from go.data.records import (
+    NO_RESULT,
+    GameRecords,
+    GameRecordWriter,
+    encode_moves,
+    encode_winner,
+    replay_games,
+)
+from go.encoders.plane import OnePlaneEncoder
+from go.goboard import GameState
+
+
+def play_random_game(board_size: int, max_moves: int) -> GameState:
+    bot = RandomBot()
+    game = GameState.new_game(board_size)
+    for _ in range(max_moves):
+        if game.is_over():
+            break
+        game = game.apply_move(bot.select_move(game))
+    return game
+
+
+def test_records_replay_to_the_same_positions(tmp_path):
+    random.seed(10)
+    games = [play_random_game(5, 40), play_random_game(5, 60)]
+    writer = GameRecordWriter(5, checkpoint_every=7)
+    for game in games:
+        writer.add_game(encode_moves(game), encode_winner(game.winner()))
+    path = str(tmp_path / "records.npz")
+    writer.save(path)
+
+    records = GameRecords(path)
+    assert len(records) == 2
+    assert records.winners[0] == NO_RESULT
+    encoder = OnePlaneEncoder(5)
+    for i, game in enumerate(games):
+        states = []
+        state = game
+        while state.previous_state is not None:
+            assert state.last_move is not None
+            if state.last_move.is_play:
+                states.append(state.previous_state)
+            state = state.previous_state
+        states.reverse()
+
+        boards, moves = records.replay(i, encoder)
+        assert np.array_equal(boards, encoder.encode_batch(states))
+        assert len(moves) == len(states)
+
+        num_moves = len(records.game_moves(i))
+        assert np.array_equal(
+            records.position(i, num_moves).board.to_array(), game.board.to_array()
+        )
+        # 20 moves in is just after a checkpoint, so this replays from it
+        expected = game
+        for _ in range(num_moves - 20):
+            assert expected.previous_state is not None
+            expected = expected.previous_state
+        middle = records.position(i, 20)
+        assert middle.next_player == expected.next_player
+        assert np.array_equal(middle.board.to_array(), expected.board.to_array())
+
+    replayed = list(replay_games(path, "plane", workers=2))
+    assert all(
+        np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+        for a, b in zip(replayed, (records.replay(i, encoder) for i in range(2)))
+    )
@@ -0,0 +1,204 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as nptype
+from numpy.lib.format import open_memmap
+
+MANIFEST = "manifest.json"
+DEFAULT_SHARD_SIZE = 1 << 16
+
+# field name -> (shape of one sample, dtype)
+Fields = Dict[str, Tuple[Tuple[int, ...], nptype.DTypeLike]]
+
+
+def shard_path(directory: str, field: str, shard: int) -> str:
+    return os.path.join(directory, f"{field}-{shard:05d}.npy")
+
+
+def write_manifest(directory: str, manifest: Dict[str, Any]):
+    # write-then-rename, so a crash leaves either the old manifest or the new
+    # one and never half of one
+    path = os.path.join(directory, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+class ShardWriter:
+    """ShardWriter:
+    Streams samples to disk in fixed-size shards, one .npy file per field per
+    shard, so memory use stays flat however big the dataset gets.
+
+    The shard being filled is an open_memmap of the full shard size. The
+    manifest is the source of truth for which shards exist and how many of
+    their rows are real. It's only rewritten, atomically, by checkpoint(),
+    which flushes everything first, so whatever is on disk after a crash is
+    consistent with it. checkpoint() also records whatever the caller wants
+    to remember (like how many games are done), and opening the same
+    directory again picks up from the last checkpoint. close() trims the
+    last shard down to the rows it holds.
+    """
+
+    def __init__(
+        self, directory: str, fields: Fields, shard_size: int = DEFAULT_SHARD_SIZE
+    ):
+        self.directory = directory
+        self.fields = {
+            name: (tuple(shape), np.dtype(dtype))
+            for name, (shape, dtype) in fields.items()
+        }
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            manifest = read_manifest(directory)
+            expected = self._describe_fields()
+            if manifest["fields"] != expected:
+                raise ValueError(
+                    f"{directory} holds {manifest['fields']}, not {expected}"
+                )
+            self.shard_size = manifest["shard_size"]
+            self.shards: List[Dict[str, Any]] = manifest["shards"]
+            self.info: Dict[str, Any] = manifest["info"]
+        else:
+            self.shards = []
+            self.info = {}
+
+        self._arrays: Optional[Dict[str, np.memmap]] = None
+        if self.shards and self.shards[-1]["size"] < self.shard_size:
+            self._reopen_last_shard()
+
+    def _describe_fields(self) -> Dict[str, Any]:
+        return {
+            name: {"shape": list(shape), "dtype": dtype.str}
+            for name, (shape, dtype) in self.fields.items()
+        }
+
+    @property
+    def num_samples(self) -> int:
+        return sum(shard["size"] for shard in self.shards)
+
+    def _new_shard(self, shard: int) -> Dict[str, np.memmap]:
+        return {
+            name: open_memmap(
+                shard_path(self.directory, name, shard),
+                mode="w+",
+                dtype=dtype,
+                shape=(self.shard_size,) + shape,
+            )
+            for name, (shape, dtype) in self.fields.items()
+        }
+
+    def _reopen_last_shard(self):
+        shard = len(self.shards) - 1
+        size = self.shards[-1]["size"]
+        arrays = {}
+        for name, (shape, dtype) in self.fields.items():
+            path = shard_path(self.directory, name, shard)
+            existing = np.load(path, mmap_mode="r")
+            if len(existing) == self.shard_size:
+                del existing
+                arrays[name] = open_memmap(path, mode="r+")
+                continue
+            # close() trimmed it, so grow it back to full size
+            tmp = path + ".tmp.npy"
+            array = open_memmap(
+                tmp, mode="w+", dtype=dtype, shape=(self.shard_size,) + shape
+            )
+            array[:size] = existing[:size]
+            array.flush()
+            del existing
+            os.replace(tmp, path)
+            arrays[name] = array
+        self._arrays = arrays
+
+    def append(self, **samples: nptype.ArrayLike):
+        """append(boards=..., moves=...): a batch of samples for every field"""
+        batches = {name: np.asarray(samples[name]) for name in self.fields}
+        count = len(next(iter(batches.values())))
+        assert all(len(batch) == count for batch in batches.values())
+
+        start = 0
+        while start < count:
+            if self._arrays is None:
+                self.shards.append({"size": 0})
+                self._arrays = self._new_shard(len(self.shards) - 1)
+            shard = self.shards[-1]
+            n = min(count - start, self.shard_size - shard["size"])
+            for name, batch in batches.items():
+                self._arrays[name][shard["size"] : shard["size"] + n] = batch[
+                    start : start + n
+                ]
+            shard["size"] += n
+            start += n
+            if shard["size"] == self.shard_size:
+                # the manifest waits for the next checkpoint, so that it
+                # never covers half of what the caller is appending
+                self._flush()
+                self._arrays = None
+
+    def checkpoint(self, **info: Any):
+        """flush what's been appended and record it, plus `info`, as done"""
+        self.info.update(info)
+        self._flush()
+        self._write_manifest()
+
+    def close(self, **info: Any):
+        self.checkpoint(**info)
+        if self._arrays is None:
+            return
+        shard = len(self.shards) - 1
+        size = self.shards[-1]["size"]
+        for name, array in self._arrays.items():
+            # save the trimmed copy next to it and swap it in, so the file is
+            # always a valid array with at least `size` rows
+            path = shard_path(self.directory, name, shard)
+            tmp = path + ".tmp.npy"
+            np.save(tmp, array[:size])
+            os.replace(tmp, path)
+        self._arrays = None
+
+    def _flush(self):
+        if self._arrays is not None:
+            for array in self._arrays.values():
+                array.flush()
+
+    def _write_manifest(self):
+        write_manifest(
+            self.directory,
+            {
+                "fields": self._describe_fields(),
+                "shard_size": self.shard_size,
+                "num_samples": self.num_samples,
+                "shards": [
+                    dict(
+                        size=shard["size"],
+                        **{
+                            name: os.path.basename(shard_path(self.directory, name, i))
+                            for name in self.fields
+                        },
+                    )
+                    for i, shard in enumerate(self.shards)
+                ],
+                "info": self.info,
+            },
+        )
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # on an exception leave the last shard as of the last checkpoint, so
+        # it can be picked up again
+        if exc_type is None:
+            self.close()
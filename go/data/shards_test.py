@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from go.data.shards import ShardWriter, read_manifest
+
+FIELDS = {"boards": ((2, 3), np.int8), "moves": ((), np.int16)}
+
+
+def read_back(directory: str):
+    manifest = read_manifest(directory)
+    boards, moves = [], []
+    for shard in manifest["shards"]:
+        boards.append(
+            np.load(os.path.join(directory, shard["boards"]))[: shard["size"]]
+        )
+        moves.append(np.load(os.path.join(directory, shard["moves"]))[: shard["size"]])
+    return np.concatenate(boards), np.concatenate(moves)
+
+
+def batch(start: int, count: int):
+    moves = np.arange(start, start + count, dtype=np.int16)
+    boards = np.broadcast_to(moves[:, None, None], (count, 2, 3)).astype(np.int8)
+    return boards, moves
+
+
+def test_shard_writer_resumes_from_last_checkpoint(tmp_path):
+    directory = str(tmp_path / "games")
+    writer = ShardWriter(directory, FIELDS, shard_size=4)
+    for game in range(3):
+        boards, moves = batch(game * 3, 3)
+        writer.append(boards=boards, moves=moves)
+        writer.checkpoint(games=game + 1)
+    # this game never gets checkpointed, as if we crashed halfway through it
+    boards, moves = batch(100, 3)
+    writer.append(boards=boards, moves=moves)
+    del writer
+
+    writer = ShardWriter(directory, FIELDS)
+    assert writer.info["games"] == 3
+    assert writer.num_samples == 9
+    boards, moves = batch(9, 3)
+    writer.append(boards=boards, moves=moves)
+    writer.close(games=4)
+
+    manifest = read_manifest(directory)
+    assert [shard["size"] for shard in manifest["shards"]] == [4, 4, 4]
+    boards, moves = read_back(directory)
+    assert moves.tolist() == list(range(12))
+    assert (boards == moves[:, None, None]).all()
+
+    # and once more after close() has trimmed the last shard
+    with ShardWriter(directory, FIELDS) as writer:
+        boards, moves = batch(12, 2)
+        writer.append(boards=boards, moves=moves)
+    boards, moves = read_back(directory)
+    assert moves.tolist() == list(range(14))
+    assert len(np.load(os.path.join(directory, "moves-00003.npy"))) == 2
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from importlib import import_module
-from typing import Tuple
+from typing import Optional, Sequence, Tuple
 
 import numpy as np
 import numpy.typing as nptype
@@ -18,6 +18,26 @@ class Encoder(ABC):
     def encode(self, game_state: GameState) -> nptype.NDArray[np.float64]:
         raise NotImplementedError()
 
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        """encode_batch:
+        Encode a batch of game states into an (N, planes, height, width)
+        array. If `out` is given it's filled in and returned, otherwise a new
+        array of `dtype` is allocated.
+
+        This one just calls encode for each state; encoders that can do
+        better should override it.
+        """
+        if out is None:
+            out = np.empty((len(game_states),) + self.shape(), dtype=dtype)
+        for i, game_state in enumerate(game_states):
+            out[i] = self.encode(game_state)
+        return out
+
     @abstractmethod
     def encode_point(self, point: Point) -> int:
         """Turn a board point into an index"""
@@ -38,6 +58,47 @@ class Encoder(ABC):
         raise NotImplementedError()
 
 
+class SquareBoardEncoder(Encoder):
+    """SquareBoardEncoder:
+    What all of our encoders have in common: `num_planes` planes over a
+    square board, and points numbered row-major starting from the bottom
+    left, which is the order legal_mask uses too. Subclasses provide name
+    and encode_batch; encode is a batch of one.
+    """
+
+    def __init__(self, board_size: int, num_planes: int):
+        # the book lets you encode non-square boards, I'm just not
+        # allowing that
+        self.board_width = self.board_height = board_size
+        self.num_planes = num_planes
+
+    def encode(self, game_state: GameState) -> nptype.NDArray[np.float64]:
+        return self.encode_batch([game_state])[0]
+
+    @abstractmethod
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        raise NotImplementedError()
+
+    def encode_point(self, point: Point) -> int:
+        return self.board_width * (point.row - 1) + (point.col - 1)
+
+    def decode_point_index(self, index: int) -> Point:
+        row = index // self.board_width
+        col = index % self.board_width
+        return Point(row=row + 1, col=col + 1)
+
+    def num_points(self) -> int:
+        return self.board_width * self.board_height
+
+    def shape(self) -> Tuple[int, int, int]:
+        return self.num_planes, self.board_height, self.board_width
+
+
 # XXX: I'm v suspicious of this function, can we eliminate it? pg. 120
 def get_encoder_by_name(name: str, board_size: int):
     module = import_module(f"go.encoders.{name}")
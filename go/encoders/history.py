@@ -0,0 +1,107 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.encoders.encoder import Encoder, SquareBoardEncoder
+from go.goboard import PLANE_BLACK, PLANE_WHITE, GameState
+from go.gotypes import Player
+
+# how many positions, counting the current one, get fed to the network
+HISTORY_DEPTH = 8
+
+# black stones, white stones, and all ones if black is to move
+PLANES_PER_POSITION = 3
+
+
+def create(board_size: int) -> Encoder:
+    return HistoryEncoder(board_size)
+
+
+def encode_position(game_state: GameState, out: nptype.NDArray):
+    planes = game_state.board.feature_planes()
+    out[0] = planes[PLANE_BLACK]
+    out[1] = planes[PLANE_WHITE]
+    out[2] = game_state.next_player == Player.black
+
+
+class HistoryBuffer:
+    """HistoryBuffer:
+    The planes for the last `depth` positions of a single game, kept in a
+    ring buffer so that moving on a move encodes one position rather than
+    all of them.
+
+    Every position is written twice, `depth` slots apart, which means the
+    last `depth` positions always sit in one contiguous slice and planes()
+    can hand them back without copying. Positions from before the game
+    started are all zeros.
+    """
+
+    def __init__(
+        self,
+        board_size: int,
+        depth: int = HISTORY_DEPTH,
+        dtype: nptype.DTypeLike = np.int8,
+    ):
+        self.depth = depth
+        self._buffer = np.zeros(
+            (2 * depth, PLANES_PER_POSITION, board_size, board_size), dtype=dtype
+        )
+        # the slot the next position goes in, which is also where the oldest
+        # one in planes() starts
+        self._next = 0
+
+    def push(self, game_state: GameState):
+        """add the position after the latest move, call it once per apply_move"""
+        slot = self._next
+        encode_position(game_state, self._buffer[slot])
+        self._buffer[slot + self.depth] = self._buffer[slot]
+        self._next = (slot + 1) % self.depth
+
+    def planes(self) -> nptype.NDArray:
+        """a (depth * PLANES_PER_POSITION, rows, cols) view, oldest first"""
+        view = self._buffer[self._next : self._next + self.depth]
+        return view.reshape((-1,) + view.shape[2:])
+
+
+class HistoryEncoder(SquareBoardEncoder):
+    """HistoryEncoder:
+    PLANES_PER_POSITION planes for each of the last `depth` positions,
+    oldest first.
+
+    encode walks back through previous_state to build the history from
+    scratch. When playing a game through from the start, keep a HistoryBuffer
+    from new_buffer alongside it and use its planes() instead, which only
+    costs one position per move.
+    """
+
+    def __init__(self, board_size: int, depth: int = HISTORY_DEPTH):
+        super().__init__(board_size, depth * PLANES_PER_POSITION)
+        self.depth = depth
+
+    def name(self) -> str:
+        return "history"
+
+    def new_buffer(self, dtype: nptype.DTypeLike = np.int8) -> HistoryBuffer:
+        return HistoryBuffer(self.board_width, self.depth, dtype)
+
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        if out is None:
+            out = np.empty((len(game_states),) + self.shape(), dtype=dtype)
+        out[:] = 0
+        for i, game_state in enumerate(game_states):
+            positions = out[i].reshape(
+                (self.depth, PLANES_PER_POSITION) + out.shape[2:]
+            )
+            state: Optional[GameState] = game_state
+            for k in range(self.depth - 1, -1, -1):
+                if state is None:
+                    break
+                encode_position(state, positions[k])
+                state = state.previous_state
+        return out
@@ -0,0 +1,22 @@
+import random
+
+import numpy as np
+
+from go.agent.naive import RandomBot
+from go.encoders.history import HistoryEncoder
+from go.goboard import GameState
+
+
+def test_history_buffer_matches_encode():
+    random.seed(8)
+    bot = RandomBot()
+    encoder = HistoryEncoder(5, depth=4)
+    game = GameState.new_game(5, track_planes=True)
+    history = encoder.new_buffer()
+    history.push(game)
+    for _ in range(12):
+        game = game.apply_move(bot.select_move(game))
+        history.push(game)
+        planes = history.planes()
+        assert np.shares_memory(planes, history._buffer)
+        assert np.array_equal(planes, encoder.encode(game))
@@ -0,0 +1,89 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.encoders.encoder import Encoder, SquareBoardEncoder
+from go.goboard import PLANE_BLACK, PLANE_LIBERTIES, PLANE_WHITE, GameState
+from go.gotypes import Player
+
+# how many of the most recent moves get a plane each
+HISTORY_MOVES = 4
+
+# where each group of planes starts
+OWN_LIBERTIES = 0
+OPPONENT_LIBERTIES = 3
+HISTORY = 6
+KO = HISTORY + HISTORY_MOVES
+BLACK_TO_MOVE = KO + 1
+NUM_PLANES = BLACK_TO_MOVE + 1
+
+
+def create(board_size: int) -> Encoder:
+    return MultiPlaneEncoder(board_size)
+
+
+class MultiPlaneEncoder(SquareBoardEncoder):
+    """MultiPlaneEncoder:
+    - the next player's stones with 1, 2 and 3+ liberties
+    - the opponent's stones with 1, 2 and 3+ liberties
+    - one plane for each of the last HISTORY_MOVES moves, most recent first
+    - the point that's off limits because of ko
+    - all ones if black is to move
+
+    The stone planes come from multiplying the Board's tracked color and
+    liberty planes together (see Board.track_planes), so there's no per-point
+    Python work; the history planes just walk back HISTORY_MOVES states.
+    """
+
+    def __init__(self, board_size: int):
+        super().__init__(board_size, NUM_PLANES)
+
+    def name(self) -> str:
+        return "multiplane"
+
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        if out is None:
+            out = np.empty((len(game_states),) + self.shape(), dtype=dtype)
+        out[:, HISTORY:] = 0
+        for i, game_state in enumerate(game_states):
+            planes = game_state.board.feature_planes()
+            black = game_state.next_player == Player.black
+            mine = PLANE_BLACK if black else PLANE_WHITE
+            theirs = PLANE_WHITE if black else PLANE_BLACK
+            liberties = planes[PLANE_LIBERTIES]
+            np.multiply(
+                liberties,
+                planes[mine],
+                out=out[i, OWN_LIBERTIES:OPPONENT_LIBERTIES],
+                dtype=out.dtype,
+                casting="unsafe",
+            )
+            np.multiply(
+                liberties,
+                planes[theirs],
+                out=out[i, OPPONENT_LIBERTIES:HISTORY],
+                dtype=out.dtype,
+                casting="unsafe",
+            )
+
+            state: Optional[GameState] = game_state
+            for k in range(HISTORY_MOVES):
+                if state is None or state.last_move is None:
+                    break
+                point = state.last_move.point
+                if point is not None:
+                    out[i, HISTORY + k, point.row - 1, point.col - 1] = 1
+                state = state.previous_state
+
+            ko = game_state.ko_point()
+            if ko is not None:
+                out[i, KO, ko.row - 1, ko.col - 1] = 1
+            if black:
+                out[i, BLACK_TO_MOVE] = 1
+        return out
@@ -0,0 +1,34 @@
+import numpy as np
+
+from go.encoders.encoder import get_encoder_by_name
+from go.encoders.multiplane import BLACK_TO_MOVE, HISTORY, KO, OPPONENT_LIBERTIES
+from go.goboard import GameState
+from go.gotypes import Move
+from go.utils import point_from_coords
+
+
+def test_multiplane_encoder():
+    game = GameState.new_game(5)
+    # black takes the white stone at C3 from C4, setting up a ko
+    moves = ["B3", "C3", "C2", "B4", "D3", "D4", "A1", "C5", "C4"]
+    for move in moves:
+        game = game.apply_move(Move.play(point_from_coords(move)))
+    encoder = get_encoder_by_name("multiplane", 5)
+    planes = encoder.encode(game)
+    assert planes.shape == encoder.shape()
+
+    # white to move, and black's C4 stone is in atari
+    c4 = point_from_coords("C4")
+    assert planes[OPPONENT_LIBERTIES, c4.row - 1, c4.col - 1] == 1
+    assert planes[HISTORY, c4.row - 1, c4.col - 1] == 1
+    c5 = point_from_coords("C5")
+    assert planes[HISTORY + 1, c5.row - 1, c5.col - 1] == 1
+    c3 = point_from_coords("C3")
+    assert planes[KO].sum() == 1 and planes[KO, c3.row - 1, c3.col - 1] == 1
+    assert not planes[BLACK_TO_MOVE].any()
+    # every stone lands in exactly one of the liberty planes
+    assert planes[:HISTORY].sum() == len(moves) - 1
+
+    batch = encoder.encode_batch([game, game.previous_state])
+    assert np.array_equal(batch[0], planes)
+    assert batch[1, BLACK_TO_MOVE].all()
@@ -1,51 +1,45 @@
-from typing import Tuple
+from typing import Optional, Sequence
 
 import numpy as np
 import numpy.typing as nptype
 
-from go.encoders.encoder import Encoder
-from go.goboard import Point, GameState
+from go.encoders.encoder import Encoder, SquareBoardEncoder
+from go.goboard import PLANE_BLACK, PLANE_WHITE, GameState
+from go.gotypes import Player
 
 
 def create(board_size: int) -> Encoder:
     return OnePlaneEncoder(board_size)
 
 
-class OnePlaneEncoder(Encoder):
+class OnePlaneEncoder(SquareBoardEncoder):
     def __init__(self, board_size: int):
-        # the book lets you encode non-square boards, I'm just not
-        # allowing that
-        self.board_width = self.board_height = board_size
-        self.num_planes = 1
+        super().__init__(board_size, 1)
 
     def name(self) -> str:
         return "oneplane"
 
-    def encode(self, game_state: GameState) -> nptype.NDArray[np.float64]:
-        board_matrix = np.zeros(self.shape())
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                p = Point(row=r + 1, col=c + 1)
-                go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    continue
-                if go_string.color == game_state.next_player:
-                    board_matrix[0, r, c] = 1
-                else:
-                    board_matrix[0, r, c] = -1
-
-        return board_matrix
-
-    def encode_point(self, point: Point) -> int:
-        return self.board_width * (point.row - 1) + (point.col - 1)
-
-    def decode_point_index(self, index: int) -> Point:
-        row = index // self.board_width
-        col = index % self.board_width
-        return Point(row=row + 1, col=col + 1)
-
-    def num_points(self) -> int:
-        return self.board_width * self.board_height
-
-    def shape(self) -> Tuple[int, int, int]:
-        return self.num_planes, self.board_height, self.board_width
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        # 1 for the next player's stones, -1 for the opponent's, straight out
+        # of the planes the board keeps up to date (see SixPlaneEncoder)
+        if out is None:
+            out = np.empty((len(game_states),) + self.shape(), dtype=dtype)
+        for i, game_state in enumerate(game_states):
+            planes = game_state.board.feature_planes()
+            if game_state.next_player == Player.black:
+                mine, theirs = PLANE_BLACK, PLANE_WHITE
+            else:
+                mine, theirs = PLANE_WHITE, PLANE_BLACK
+            np.subtract(
+                planes[mine],
+                planes[theirs],
+                out=out[i, 0],
+                dtype=out.dtype,
+                casting="unsafe",
+            )
+        return out
@@ -0,0 +1,33 @@
+import numpy as np
+
+from go.encoders.plane import OnePlaneEncoder
+from go.goboard import GameState
+from go.gotypes import Move
+from go.utils import point_from_coords
+
+
+def play(board_size: int, *moves: str) -> GameState:
+    game = GameState.new_game(board_size)
+    for move in moves:
+        game = game.apply_move(Move.play(point_from_coords(move)))
+    return game
+
+
+def test_encode_is_relative_to_next_player():
+    game = play(5, "A1", "B2", "C3")
+    planes = OnePlaneEncoder(5).encode(game)
+    assert planes.dtype == np.float64
+    # white to move
+    assert planes[0, 0, 0] == -1
+    assert planes[0, 1, 1] == 1
+    assert planes[0, 2, 2] == -1
+    assert np.abs(planes).sum() == 3
+
+
+def test_encode_batch_fills_buffer():
+    encoder = OnePlaneEncoder(5)
+    games = [play(5, "A1"), play(5, "A1", "E5")]
+    out = np.zeros((2,) + encoder.shape(), dtype=np.int8)
+    assert encoder.encode_batch(games, out=out) is out
+    assert np.array_equal(out[0], encoder.encode(games[0]))
+    assert np.array_equal(out[1], encoder.encode(games[1]))
@@ -0,0 +1,55 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.encoders.encoder import Encoder, SquareBoardEncoder
+from go.goboard import PLANE_BLACK, PLANE_LIBERTIES, PLANE_WHITE, GameState
+from go.gotypes import Player
+
+
+def create(board_size: int) -> Encoder:
+    return SixPlaneEncoder(board_size)
+
+
+class SixPlaneEncoder(SquareBoardEncoder):
+    """SixPlaneEncoder:
+    The next player's stones, the opponent's stones, stones of either color
+    with 1, 2 and 3+ liberties, and the point that's off limits because of
+    ko.
+
+    Everything but the ko plane is copied straight out of the planes the
+    Board keeps up to date as it goes (see Board.track_planes), so games
+    that will be encoded a lot should be started with
+    GameState.new_game(size, track_planes=True). Boards that aren't tracking
+    get their planes built on first use.
+    """
+
+    def __init__(self, board_size: int):
+        super().__init__(board_size, 6)
+
+    def name(self) -> str:
+        return "sixplane"
+
+    def encode_batch(
+        self,
+        game_states: Sequence[GameState],
+        out: Optional[nptype.NDArray] = None,
+        dtype: nptype.DTypeLike = np.float64,
+    ) -> nptype.NDArray:
+        if out is None:
+            out = np.empty((len(game_states),) + self.shape(), dtype=dtype)
+        for i, game_state in enumerate(game_states):
+            planes = game_state.board.feature_planes()
+            if game_state.next_player == Player.black:
+                mine, theirs = PLANE_BLACK, PLANE_WHITE
+            else:
+                mine, theirs = PLANE_WHITE, PLANE_BLACK
+            out[i, 0] = planes[mine]
+            out[i, 1] = planes[theirs]
+            out[i, 2:5] = planes[PLANE_LIBERTIES]
+            out[i, 5] = 0
+            ko = game_state.ko_point()
+            if ko is not None:
+                out[i, 5, ko.row - 1, ko.col - 1] = 1
+        return out
@@ -0,0 +1,77 @@
+import random
+from typing import Optional, Tuple
+
+import numpy as np
+import numpy.typing as nptype
+
+# a Go board looks the same under any of its 4 rotations, with or without a
+# flip, so every training position is worth 8
+NUM_SYMMETRIES = 8
+
+
+def dihedral(planes: nptype.NDArray, k: int) -> nptype.NDArray:
+    """dihedral:
+    Symmetry k (0 is the identity) of the last two axes of `planes`, as a
+    strided view rather than a copy: k % 4 quarter turns, then a left-right
+    flip for k >= 4.
+    """
+    view = np.rot90(planes, k % 4, axes=(-2, -1))
+    if k >= 4:
+        view = view[..., ::-1]
+    return view
+
+
+class DihedralAugmenter:
+    """DihedralAugmenter:
+    Applies the 8 board symmetries to encoded boards and the matching move
+    targets.
+
+    Boards go through `dihedral`, so they stay views. Move targets are point
+    indices in encoder order (or one-hot vectors over them) and get remapped
+    through permutation tables worked out once up front.
+
+    Called with an (x, y) pair it applies a random symmetry, which is how
+    SequentialNetwork.train takes it as a `transform`: each time a sample is
+    drawn it gets a fresh symmetry, so the stored data never grows.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int]):
+        # the encoder's (planes, height, width)
+        self.shape = shape
+        _, height, width = shape
+        assert height == width, "only square boards have all 8 symmetries"
+        num_points = height * width
+        points = np.arange(num_points).reshape(height, width)
+        # moved_from[k][j]: the point that ends up at j under symmetry k
+        self.moved_from = np.stack(
+            [dihedral(points, k).ravel() for k in range(NUM_SYMMETRIES)]
+        )
+        # moved_to[k][i]: where point i ends up under symmetry k
+        self.moved_to = np.empty_like(self.moved_from)
+        for k in range(NUM_SYMMETRIES):
+            self.moved_to[k, self.moved_from[k]] = np.arange(num_points)
+
+    def transform_planes(self, planes: nptype.NDArray, k: int) -> nptype.NDArray:
+        """planes in encoder shape, or a flattened (size, 1) column of them"""
+        if planes.shape == self.shape:
+            return dihedral(planes, k)
+        # the dense layers want a column vector, which a strided view can't
+        # be, so this is the one case that copies
+        return dihedral(planes.reshape(self.shape), k).reshape(planes.shape)
+
+    def transform_point(self, index: int, k: int) -> int:
+        return int(self.moved_to[k, index])
+
+    def transform_target(self, target: nptype.NDArray, k: int) -> nptype.NDArray:
+        """a one-hot (or any per-point) target over encoder point indices"""
+        return target[self.moved_from[k]]
+
+    def __call__(
+        self,
+        feature: Tuple[nptype.NDArray, nptype.NDArray],
+        k: Optional[int] = None,
+    ) -> Tuple[nptype.NDArray, nptype.NDArray]:
+        if k is None:
+            k = random.randrange(NUM_SYMMETRIES)
+        x, y = feature
+        return self.transform_planes(x, k), self.transform_target(y, k)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from go.encoders.plane import OnePlaneEncoder
+from go.encoders.symmetry import NUM_SYMMETRIES, DihedralAugmenter
+from go.goboard import GameState
+from go.gotypes import Move
+from go.utils import point_from_coords
+
+
+def test_symmetries_move_stones_and_targets_together():
+    encoder = OnePlaneEncoder(5)
+    augmenter = DihedralAugmenter(encoder.shape())
+    game = GameState.new_game(5).apply_move(Move.play(point_from_coords("B1")))
+    planes = encoder.encode(game)
+    move = encoder.encode_point(point_from_coords("D2"))
+    target = np.zeros(encoder.num_points())
+    target[move] = 1
+
+    seen = set()
+    for k in range(NUM_SYMMETRIES):
+        x, y = augmenter((planes, target), k)
+        assert np.shares_memory(x, planes)
+        # the move lands where the symmetry sends it, and it's still empty
+        moved = augmenter.transform_point(move, k)
+        assert y[moved] == 1 and y.sum() == 1
+        point = encoder.decode_point_index(moved)
+        assert x[0, point.row - 1, point.col - 1] == 0
+        # and the stone goes through the same permutation as the target does
+        stone = encoder.encode_point(point_from_coords("B1"))
+        point = encoder.decode_point_index(augmenter.transform_point(stone, k))
+        assert x[0, point.row - 1, point.col - 1] != 0
+        assert x.sum() == planes.sum()
+        seen.add(x.tobytes())
+    # B1 isn't on any symmetry axis, so all 8 boards differ
+    assert len(seen) == NUM_SYMMETRIES
@@ -1,8 +1,69 @@
 import copy
+
+import numpy as np
+import numpy.typing as nptype
+
 from go.gotypes import Point, Player, Move
 from go.zobrist import EMPTY_BOARD, HASH_CODE
 from go.scoring import compute_game_result
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, KeysView, List, Optional, Sequence, Set, Tuple
+
+# neighbor lists for every point on a board of a given size, shared by all the
+# boards of that size so place_stone doesn't have to build and bounds-check
+# Points over and over
+_NEIGHBOR_TABLES: Dict[Tuple[int, int], Dict[Point, List[Point]]] = {}
+
+
+def neighbor_table(num_rows: int, num_cols: int) -> Dict[Point, List[Point]]:
+    table = _NEIGHBOR_TABLES.get((num_rows, num_cols))
+    if table is None:
+        table = {}
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                point = Point(row=r, col=c)
+                table[point] = [
+                    n
+                    for n in point.neighbors()
+                    if 1 <= n.row <= num_rows and 1 <= n.col <= num_cols
+                ]
+        _NEIGHBOR_TABLES[num_rows, num_cols] = table
+    return table
+
+
+# A 3x3 pattern code describes the neighborhood of an empty point: two bits
+# for each of the 8 surrounding points, in PATTERN_OFFSETS order, followed by
+# an atari flag for each of the 4 orthogonal ones.
+PATTERN_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+PATTERN_EMPTY = 0
+PATTERN_BLACK = Player.black.value
+PATTERN_WHITE = Player.white.value
+PATTERN_EDGE = 3
+# positions in PATTERN_OFFSETS of the orthogonal neighbors, whose atari flags
+# live at bits 16-19
+PATTERN_ORTHOGONAL = [1, 3, 4, 6]
+PATTERN_ATARI_SHIFT = 16
+NUM_PATTERNS = 1 << 20
+
+_PATTERN_TABLES: Dict[Tuple[int, int], Dict[Point, List[Optional[Point]]]] = {}
+
+
+def pattern_table(num_rows: int, num_cols: int) -> Dict[Point, List[Optional[Point]]]:
+    """the 8 surrounding points of every point, None where they're off the board"""
+    table = _PATTERN_TABLES.get((num_rows, num_cols))
+    if table is None:
+        table = {}
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                table[Point(row=r, col=c)] = [
+                    (
+                        Point(row=r + dr, col=c + dc)
+                        if 1 <= r + dr <= num_rows and 1 <= c + dc <= num_cols
+                        else None
+                    )
+                    for dr, dc in PATTERN_OFFSETS
+                ]
+        _PATTERN_TABLES[num_rows, num_cols] = table
+    return table
 
 
 class GoString:
@@ -42,12 +103,77 @@ class GoString:
         )
 
 
+# Layout of the feature planes a Board can keep (see Board.track_planes): a
+# plane per color, then stones with 1, 2 and 3+ liberties regardless of color
+PLANE_BLACK = 0
+PLANE_WHITE = 1
+PLANE_LIBERTIES = slice(2, 5)
+NUM_BOARD_PLANES = 5
+
+
 class Board:
-    def __init__(self, num_rows: int, num_cols: int):
+    def __init__(self, num_rows: int, num_cols: int, track_planes: bool = False):
         self.num_rows = num_rows
         self.num_cols = num_cols
         self._grid: Dict[Point, Optional[GoString]] = {}
         self._hash = EMPTY_BOARD
+        # stones captured by the last place_stone, for ko detection
+        self._captured: List[Point] = []
+        self._neighbors = neighbor_table(num_rows, num_cols)
+        self._surrounding = pattern_table(num_rows, num_cols)
+
+        # Incremental indexes for rollout policies, kept up to date by
+        # place_stone. `_atari` maps the last liberty of each string in atari
+        # to how many strings of that color it's the last liberty of, and
+        # `_self_atari` holds the empty points where playing would leave the
+        # new string with a single liberty (without capturing anything), and
+        # `_suicide` the ones where it would leave it with none.
+        self._atari: Dict[Player, Dict[Point, int]] = {
+            Player.black: {},
+            Player.white: {},
+        }
+        self._self_atari: Dict[Player, Set[Point]] = {
+            Player.black: set(),
+            Player.white: set(),
+        }
+        self._suicide: Dict[Player, Set[Point]] = {
+            Player.black: set(),
+            Player.white: set(),
+        }
+        # 3x3 pattern code of every empty point, see PATTERN_OFFSETS
+        self._patterns: Dict[Point, int] = {}
+        # points whose self-atari status or pattern may have changed during
+        # the current place_stone
+        self._dirty: Set[Point] = set()
+        self._dirty.update(self._neighbors)
+        self._refresh_points()
+
+        self._planes: Optional[nptype.NDArray[np.int8]] = None
+        if track_planes:
+            self.track_planes()
+
+    def __deepcopy__(self, memo) -> "Board":
+        # GoStrings are immutable, so the grid and indexes only need to be
+        # copied one level deep
+        board = Board.__new__(Board)
+        board.num_rows = self.num_rows
+        board.num_cols = self.num_cols
+        board._grid = dict(self._grid)
+        board._hash = self._hash
+        board._captured = list(self._captured)
+        board._neighbors = self._neighbors
+        board._surrounding = self._surrounding
+        board._atari = {player: dict(points) for player, points in self._atari.items()}
+        board._self_atari = {
+            player: set(points) for player, points in self._self_atari.items()
+        }
+        board._suicide = {
+            player: set(points) for player, points in self._suicide.items()
+        }
+        board._patterns = dict(self._patterns)
+        board._dirty = set()
+        board._planes = None if self._planes is None else self._planes.copy()
+        return board
 
     def place_stone(self, player: Player, point: Point):
         assert self.is_on_grid(point)
@@ -55,11 +181,10 @@ class Board:
 
         adjacent_same_color: List[GoString] = []
         adjacent_opposite_color: List[GoString] = []
+        self._captured = []
 
         liberties: List[Point] = []
-        for neighbor in point.neighbors():
-            if not self.is_on_grid(neighbor):
-                continue
+        for neighbor in self._neighbors[point]:
             neighbor_string = self._grid.get(neighbor)
             if neighbor_string is None:
                 liberties.append(neighbor)
@@ -74,9 +199,13 @@ class Board:
 
         # merge any adjacent strings of the same color
         for same_color_string in adjacent_same_color:
+            self._unindex_string(same_color_string)
             new_string = new_string.merged_with(same_color_string)
         for new_string_point in new_string.stones:
             self._grid[new_string_point] = new_string
+        self._index_string(new_string)
+        self._dirty.add(point)
+        self._dirty.update(n for n in self._surrounding[point] if n)
 
         # apply the hash code for this point and player to the zobrist hash
         self._hash ^= HASH_CODE[(point, player)]
@@ -94,6 +223,8 @@ class Board:
             if other_color_string.num_liberties == 0:
                 self._remove_string(other_color_string)
 
+        self._refresh_points()
+
     def is_on_grid(self, point: Point) -> bool:
         return 1 <= point.row <= self.num_rows and 1 <= point.col <= self.num_cols
 
@@ -109,20 +240,224 @@ class Board:
             return None
         return string
 
+    @classmethod
+    def from_array(
+        cls, array: nptype.NDArray[np.integer], track_planes: bool = False
+    ) -> "Board":
+        """from_array:
+        The inverse of to_array. Placing every black stone before any white
+        one means nothing gets captured on the way, as long as the array
+        is a position where every string has a liberty.
+        """
+        num_rows, num_cols = array.shape
+        board = cls(num_rows, num_cols, track_planes)
+        for player in (Player.black, Player.white):
+            for row, col in zip(*np.nonzero(array == player.value)):
+                board.place_stone(player, Point(row=int(row) + 1, col=int(col) + 1))
+        return board
+
+    def to_array(self) -> nptype.NDArray[np.int8]:
+        """to_array:
+        The board as a (num_rows, num_cols) int8 array holding 0 for empty
+        points and Player.value for stones. Row 0 is row 1 of the board.
+        """
+        array = np.zeros((self.num_rows, self.num_cols), dtype=np.int8)
+        rows = {Player.black: [], Player.white: []}
+        cols = {Player.black: [], Player.white: []}
+        for point, string in self._grid.items():
+            if string is not None:
+                rows[string.color].append(point.row - 1)
+                cols[string.color].append(point.col - 1)
+        for player in (Player.black, Player.white):
+            array[rows[player], cols[player]] = player.value
+        return array
+
+    def track_planes(self):
+        """track_planes:
+        Start keeping a (NUM_BOARD_PLANES, num_rows, num_cols) int8 tensor of
+        feature planes up to date as stones are placed and captured, so that
+        encoders can copy it rather than rebuilding it. Copies of the board
+        keep tracking.
+        """
+        if self._planes is not None:
+            return
+        self._planes = np.zeros(
+            (NUM_BOARD_PLANES, self.num_rows, self.num_cols), dtype=np.int8
+        )
+        # GoStrings aren't hashable, and every stone in one points at it
+        strings = {id(s): s for s in self._grid.values() if s is not None}
+        for string in strings.values():
+            self._update_planes(string)
+
+    def feature_planes(self) -> nptype.NDArray[np.int8]:
+        """the tracked feature planes, see PLANE_BLACK; don't modify them"""
+        self.track_planes()
+        assert self._planes is not None
+        return self._planes
+
+    def _update_planes(self, string: GoString):
+        planes = self._planes
+        assert planes is not None
+        liberties = min(string.num_liberties, 3)
+        color = PLANE_BLACK if string.color == Player.black else PLANE_WHITE
+        for point in string.stones:
+            r, c = point.row - 1, point.col - 1
+            planes[color, r, c] = 1
+            planes[PLANE_LIBERTIES, r, c] = 0
+            # a freshly placed stone can have no liberties until the stones
+            # it captures come off the board
+            if liberties:
+                planes[PLANE_LIBERTIES.start + liberties - 1, r, c] = 1
+
+    def atari_liberties(self, color: Player) -> KeysView[Point]:
+        """the last liberties of `color`'s strings that are in atari
+
+        For `color` these are escape points; for the other player they're
+        captures.
+        """
+        return self._atari[color].keys()
+
+    def self_atari_points(self, color: Player) -> Set[Point]:
+        """empty points where `color` would put its own string in atari"""
+        return self._self_atari[color]
+
+    def suicide_points(self, color: Player) -> Set[Point]:
+        """empty points `color` can't play on because it would be suicide"""
+        return self._suicide[color]
+
+    def hash_after(self, player: Player, point: Point) -> int:
+        """hash_after:
+        What zobrist_hash would be after `player` plays at `point`, worked out
+        without playing it. Assumes the move isn't suicide.
+        """
+        new_hash = self._hash ^ HASH_CODE[point, player]
+        # GoStrings aren't hashable, so dedupe the captures by identity
+        captured = {}
+        for neighbor in self._neighbors[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if (
+                neighbor_string is not None
+                and neighbor_string.color != player
+                and neighbor_string.num_liberties == 1
+            ):
+                captured[id(neighbor_string)] = neighbor_string
+        for string in captured.values():
+            for stone in string.stones:
+                new_hash ^= HASH_CODE[stone, string.color]
+        return new_hash
+
+    def patterns(self) -> Dict[Point, int]:
+        """the 3x3 pattern code of every empty point; don't modify it"""
+        return self._patterns
+
+    def _index_string(self, string: GoString):
+        if self._planes is not None:
+            self._update_planes(string)
+        self._dirty.update(string.liberties)
+        if string.num_liberties == 1:
+            (liberty,) = string.liberties
+            atari = self._atari[string.color]
+            atari[liberty] = atari.get(liberty, 0) + 1
+
+    def _unindex_string(self, string: GoString):
+        self._dirty.update(string.liberties)
+        if string.num_liberties == 1:
+            (liberty,) = string.liberties
+            atari = self._atari[string.color]
+            if atari[liberty] == 1:
+                del atari[liberty]
+            else:
+                atari[liberty] -= 1
+
+    def _is_self_atari(self, point: Point, color: Player) -> bool:
+        liberties: Set[Point] = set()
+        for neighbor in self._neighbors[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is None:
+                liberties.add(neighbor)
+            elif neighbor_string.color == color:
+                liberties |= neighbor_string.liberties
+            elif neighbor_string.num_liberties == 1:
+                # playing here captures, which frees up liberties
+                return False
+        liberties.discard(point)
+        return len(liberties) == 1
+
+    def _is_suicide(self, point: Point, color: Player) -> bool:
+        for neighbor in self._neighbors[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is None:
+                return False
+            if neighbor_string.color == color:
+                if neighbor_string.num_liberties > 1:
+                    return False
+            elif neighbor_string.num_liberties == 1:
+                return False
+        return True
+
+    def _pattern_code(self, point: Point) -> int:
+        code = 0
+        for i, neighbor in enumerate(self._surrounding[point]):
+            if neighbor is None:
+                code |= PATTERN_EDGE << (2 * i)
+                continue
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is not None:
+                code |= neighbor_string.color.value << (2 * i)
+        for bit, i in enumerate(PATTERN_ORTHOGONAL):
+            neighbor = self._surrounding[point][i]
+            if neighbor is None:
+                continue
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is not None and neighbor_string.num_liberties == 1:
+                code |= 1 << (PATTERN_ATARI_SHIFT + bit)
+        return code
+
+    def _refresh_points(self):
+        for point in self._dirty:
+            empty = self._grid.get(point) is None
+            for color in (Player.black, Player.white):
+                points = self._self_atari[color]
+                if empty and self._is_self_atari(point, color):
+                    points.add(point)
+                else:
+                    points.discard(point)
+                points = self._suicide[color]
+                if empty and self._is_suicide(point, color):
+                    points.add(point)
+                else:
+                    points.discard(point)
+            if empty:
+                self._patterns[point] = self._pattern_code(point)
+            else:
+                self._patterns.pop(point, None)
+        self._dirty.clear()
+
     def _replace_string(self, string: GoString):
+        # the string being replaced covers the same stones
+        old_string = self._grid[next(iter(string.stones))]
+        assert old_string is not None
+        self._unindex_string(old_string)
         for point in string.stones:
             self._grid[point] = string
+        self._index_string(string)
 
     def _remove_string(self, string: GoString):
+        self._unindex_string(string)
         for point in string.stones:
             # removing a string can create liberties for other strings
-            for neighbor in point.neighbors():
+            for neighbor in self._neighbors[point]:
                 neighbor_string = self._grid.get(neighbor)
                 if neighbor_string is None:
                     continue
                 if neighbor_string is not string:
                     self._replace_string(neighbor_string.with_liberty(point))
             self._grid[point] = None
+            self._captured.append(point)
+            if self._planes is not None:
+                self._planes[:, point.row - 1, point.col - 1] = 0
+            self._dirty.add(point)
+            self._dirty.update(n for n in self._surrounding[point] if n)
 
             # unappply the hash for this move
             self._hash ^= HASH_CODE[point, string.color]
@@ -162,10 +497,10 @@ class GameState:
         return GameState(next_board, self.next_player.other, self, move)
 
     @classmethod
-    def new_game(cls, board_size: int) -> "GameState":
+    def new_game(cls, board_size: int, track_planes: bool = False) -> "GameState":
         # the book's code allows int | Tuple[int, int] but tbh that's dumb and
         # we'll just allow one or the other
-        board = Board(board_size, board_size)
+        board = Board(board_size, board_size, track_planes)
         return GameState(board, Player.black, None, None)
 
     def is_over(self) -> bool:
@@ -193,6 +528,30 @@ class GameState:
         assert new_string
         return new_string.num_liberties == 0
 
+    def ko_point(self) -> Optional[Point]:
+        """ko_point:
+        The point the next player can't play on right now because it would
+        retake a ko, if there is one.
+
+        This only spots simple ko: the last move captured a single stone and
+        is itself a lone stone whose only liberty is where that stone was.
+        """
+        move = self.last_move
+        if move is None or not move.is_play:
+            return None
+        assert move.point
+        captured = self.board._captured
+        if len(captured) != 1:
+            return None
+        string = self.board.get_go_string(move.point)
+        if (
+            string is None
+            or len(string.stones) != 1
+            or string.liberties != frozenset(captured)
+        ):
+            return None
+        return captured[0]
+
     @property
     def situation(self) -> Tuple[Player, Board]:
         return (self.next_player, self.board)
@@ -231,18 +590,50 @@ class GameState:
     #
     # https://github.com/maxpumperla/deep_learning_and_the_game_of_go/blob/6148f57eb98e4c75b102d096401efe780e911442/code/dlgo/goboard_slow.py
     def legal_moves(self) -> List[Move]:
-        moves = []
-        for row in range(1, self.board.num_rows + 1):
-            for col in range(1, self.board.num_cols + 1):
-                move = Move.play(Point(row, col))
-                if self.is_valid_move(move):
-                    moves.append(move)
+        num_cols = self.board.num_cols
+        moves = [
+            Move.play(Point(row=index // num_cols + 1, col=index % num_cols + 1))
+            # tolist so the coordinates are plain ints rather than np.int64
+            for index in np.flatnonzero(self.legal_mask()).tolist()
+        ]
         # These two moves are always legal.
         moves.append(Move.pass_turn())
         moves.append(Move.resign())
 
         return moves
 
+    def legal_mask(
+        self, out: Optional[nptype.NDArray[np.bool_]] = None
+    ) -> nptype.NDArray[np.bool_]:
+        """legal_mask:
+        A boolean array over the board's points in row-major order (the same
+        order encoders use for encode_point) that's True where the next
+        player can play. Passing and resigning aren't included.
+
+        This agrees with is_valid_move, but reads empty points and suicides
+        off the Board's indexes and checks ko by working out the hash each
+        move would lead to, rather than copying the board for every point.
+        """
+        board = self.board
+        if out is None:
+            out = np.zeros(board.num_rows * board.num_cols, dtype=np.bool_)
+        else:
+            out[:] = False
+        if self.is_over():
+            return out
+
+        player = self.next_player
+        suicide = board.suicide_points(player)
+        num_cols = board.num_cols
+        # empty points are exactly the ones with a pattern code
+        for point in board.patterns():
+            if point in suicide:
+                continue
+            if (player.other, board.hash_after(player, point)) in self.previous_states:
+                continue
+            out[(point.row - 1) * num_cols + point.col - 1] = True
+        return out
+
     def winner(self) -> Optional[Player]:
         if not self.is_over() or not self.last_move:
             return None
@@ -250,3 +641,20 @@ class GameState:
             return self.next_player
         game_result = compute_game_result(self)
         return game_result.winner
+
+
+def legal_masks(
+    game_states: Sequence[GameState], out: Optional[nptype.NDArray[np.bool_]] = None
+) -> nptype.NDArray[np.bool_]:
+    """legal_masks:
+    GameState.legal_mask for a batch of same-sized games, stacked into an
+    (N, num_points) array. If `out` is given it's filled in and returned.
+    """
+    if out is None:
+        board = game_states[0].board
+        out = np.empty(
+            (len(game_states), board.num_rows * board.num_cols), dtype=np.bool_
+        )
+    for i, game_state in enumerate(game_states):
+        game_state.legal_mask(out[i])
+    return out
@@ -0,0 +1,139 @@
+import copy
+import random
+
+import numpy as np
+
+from go.agent.heuristic import HeuristicBot
+from go.agent.naive import RandomBot
+from go.goboard import Board, GameState, legal_masks
+from go.gotypes import Move, Player, Point
+from go.utils import point_from_coords
+
+
+def brute_force_atari(board: Board, color: Player):
+    liberties = set()
+    for r in range(1, board.num_rows + 1):
+        for c in range(1, board.num_cols + 1):
+            string = board.get_go_string(Point(r, c))
+            if string and string.color == color and string.num_liberties == 1:
+                liberties |= string.liberties
+    return liberties
+
+
+def brute_force_self_atari(board: Board, color: Player):
+    points = set()
+    for r in range(1, board.num_rows + 1):
+        for c in range(1, board.num_cols + 1):
+            point = Point(r, c)
+            if board.get(point) is not None:
+                continue
+            next_board = copy.deepcopy(board)
+            captured = any(
+                (s := board.get_go_string(n)) is not None
+                and s.color != color
+                and s.num_liberties == 1
+                for n in point.neighbors()
+            )
+            next_board.place_stone(color, point)
+            string = next_board.get_go_string(point)
+            assert string
+            if not captured and string.num_liberties == 1:
+                points.add(point)
+    return points
+
+
+def test_incremental_indexes_match_brute_force():
+    random.seed(5)
+    bot = RandomBot()
+    game = GameState.new_game(5)
+    for _ in range(60):
+        if game.is_over():
+            break
+        game = game.apply_move(bot.select_move(game))
+        board = game.board
+        for color in (Player.black, Player.white):
+            assert set(board.atari_liberties(color)) == brute_force_atari(board, color)
+            assert board.self_atari_points(color) == brute_force_self_atari(
+                board, color
+            )
+
+
+def test_heuristic_bot_captures():
+    game = GameState.new_game(5)
+    # white stone at C3 surrounded on three sides by black
+    for move in ["C2", "C3", "B3", "A1", "D3", "A2"]:
+        game = game.apply_move(Move.play(point_from_coords(move)))
+    assert game.next_player == Player.black
+    move = HeuristicBot().select_move(game)
+    assert move.point == point_from_coords("C4")
+
+
+def test_incremental_patterns_match_from_scratch():
+    random.seed(6)
+    bot = RandomBot()
+    game = GameState.new_game(5)
+    for _ in range(60):
+        if game.is_over():
+            break
+        game = game.apply_move(bot.select_move(game))
+        board = game.board
+        fresh = copy.deepcopy(board)
+        fresh._patterns = {}
+        fresh._dirty.update(fresh._neighbors)
+        fresh._refresh_points()
+        assert board.patterns() == fresh.patterns()
+
+
+def test_incremental_planes_match_from_scratch():
+    random.seed(7)
+    bot = RandomBot()
+    game = GameState.new_game(5, track_planes=True)
+    for _ in range(80):
+        if game.is_over():
+            break
+        game = game.apply_move(bot.select_move(game))
+        fresh = copy.deepcopy(game.board)
+        fresh._planes = None
+        assert np.array_equal(game.board.feature_planes(), fresh.feature_planes())
+
+
+def test_ko_point():
+    game = GameState.new_game(5)
+    # black takes the white stone at C3 from C4 and white can't take back
+    for move in ["B3", "C3", "C2", "B4", "D3", "D4", "A1", "C5", "C4"]:
+        game = game.apply_move(Move.play(point_from_coords(move)))
+    ko = point_from_coords("C3")
+    assert game.ko_point() == ko
+    assert not game.is_valid_move(Move.play(ko))
+    assert not game.legal_mask()[(ko.row - 1) * 5 + ko.col - 1]
+    game = game.apply_move(Move.play(point_from_coords("A5")))
+    assert game.ko_point() is None
+
+
+def test_legal_mask_matches_is_valid_move():
+    random.seed(9)
+    bot = RandomBot()
+    games = []
+    game = GameState.new_game(5)
+    for _ in range(80):
+        if game.is_over():
+            break
+        game = game.apply_move(bot.select_move(game))
+        games.append(game)
+        expected = [
+            game.is_valid_move(Move.play(Point(row, col)))
+            for row in range(1, 6)
+            for col in range(1, 6)
+        ]
+        assert game.legal_mask().tolist() == expected
+    masks = legal_masks(games)
+    assert masks.shape == (len(games), 25)
+    assert np.array_equal(masks[-1], games[-1].legal_mask())
+
+
+def test_legal_moves_have_int_coordinates():
+    game = GameState.new_game(5)
+    points = [move.point for move in game.legal_moves() if move.point is not None]
+    assert len(points) == 25
+    for point in points:
+        assert type(point.row) is int and type(point.col) is int
@@ -46,3 +46,27 @@ class Move:
     @classmethod
     def resign(cls) -> "Move":
         return Move(is_resign=True)
+
+
+# Moves as ints, for the MCTS node pool and the game records: a row-major
+# point index, or one of these negative codes for the moves without a point.
+RESIGN = -2
+PASS = -1
+
+
+def encode_move(move: Move, num_cols: int) -> int:
+    if move.is_pass:
+        return PASS
+    if move.is_resign:
+        return RESIGN
+    assert move.point
+    return (move.point.row - 1) * num_cols + (move.point.col - 1)
+
+
+def decode_move(code: int, num_cols: int) -> Move:
+    if code == PASS:
+        return Move.pass_turn()
+    if code == RESIGN:
+        return Move.resign()
+    assert code >= 0
+    return Move.play(Point(row=code // num_cols + 1, col=code % num_cols + 1))
@@ -1,15 +1,183 @@
+from collections import Counter, OrderedDict
 import random
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
-from go.gotypes import Player
+from go.gotypes import Player, Move
 from go.goboard import GameState
 
+# how many game states a tree keeps materialized, not counting the root. Each
+# one is a full Board plus its history, so this is the knob that trades
+# memory for replaying moves on the way down the tree.
+DEFAULT_MAX_STATES = 2000
+
+# Once max_states is used up, states still get replayed on demand, and the
+# last few of those are kept around regardless of the budget. Expanding a
+# node asks for its state (for its legal moves) and then straight away for
+# its new child's, which should be one move from it and not a replay from
+# the closest materialized ancestor all over again.
+RECENT_STATES = 16
+
+# (node, visits, parent's visits, subtree size)
+SubtreeInfo = Tuple[Any, int, int, int]
+
+
+def choose_cold_subtrees(subtrees: List[SubtreeInfo], num_to_free: int) -> List[Any]:
+    """choose_cold_subtrees:
+    Pick disjoint subtrees to free, least-visited first, until at least
+    num_to_free nodes are covered (or as close as we can get).
+
+    `subtrees` has an entry for every non-root node. For a visit threshold t,
+    the subtrees rooted at nodes with fewer than t visits whose parent has at
+    least t never overlap, so we look for the smallest t that frees enough
+    nodes and take from those subtrees in order of visits.
+    """
+    # node n is a candidate for every t in (visits(n), visits(parent(n))], so
+    # sweeping over the endpoints gives the number of freeable nodes per t
+    sweep: Counter = Counter()
+    for _, visits, parent_visits, size in subtrees:
+        sweep[visits + 1] += size
+        sweep[parent_visits + 1] -= size
+
+    freeable = 0
+    best_freeable = 0
+    threshold = 0
+    for t in sorted(sweep):
+        freeable += sweep[t]
+        if freeable > best_freeable:
+            best_freeable = freeable
+            threshold = t
+        if freeable >= num_to_free:
+            break
+
+    candidates = sorted(
+        (s for s in subtrees if s[1] < threshold <= s[2]), key=lambda s: s[1]
+    )
+    chosen = []
+    freed = 0
+    for node, _, _, size in candidates:
+        if freed >= num_to_free:
+            break
+        chosen.append(node)
+        freed += size
+    return chosen
+
+
+class MCTSTree:
+    """bookkeeping shared by every node in one search tree"""
+
+    def __init__(self, max_states: int = DEFAULT_MAX_STATES):
+        self.root: Optional["MCTSNode"] = None
+        self.max_states = max_states
+        self.num_states = 0
+        self.num_allocated = 0
+        self.num_pruned = 0
+        # replayed states that didn't fit in max_states, least recently used
+        # first
+        self.recent: "OrderedDict[MCTSNode, GameState]" = OrderedDict()
+
+    def remember(self, node: "MCTSNode", game_state: GameState):
+        self.recent[node] = game_state
+        self.recent.move_to_end(node)
+        if len(self.recent) > RECENT_STATES:
+            self.recent.popitem(last=False)
+
+    @property
+    def num_alive(self) -> int:
+        return self.num_allocated - self.num_pruned
+
+    def prune(self, max_alive: int):
+        """prune:
+        Free the least-visited subtrees until at most max_alive nodes are
+        left.
+
+        A pruned subtree's statistics are already counted in its parent, so
+        all we lose is how they were split up; the pruned move goes back on
+        the parent's unvisited list and can be expanded again later. The
+        root's most-visited child and the one with the best winning fraction
+        (the move MCTSAgent would play right now) are never pruned, though
+        their subtrees can be, so there's always a move to pick afterwards.
+        """
+        root = self.root
+        assert root
+        if self.num_alive <= max_alive:
+            return
+
+        # pre-order, so walking it backwards sees children before parents
+        order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children)
+        sizes = {}
+        for node in reversed(order):
+            sizes[node] = 1 + sum(sizes[child] for child in node.children)
+
+        keep = []
+        if root.children:
+            keep.append(max(root.children, key=lambda child: child.num_rollouts))
+        visited = [child for child in root.children if child.num_rollouts > 0]
+        if visited:
+            player = root.next_player
+            keep.append(max(visited, key=lambda child: child.winning_frac(player)))
+        subtrees = []
+        for node in order[1:]:
+            assert node.parent
+            if any(node is kept for kept in keep):
+                continue
+            subtrees.append(
+                (node, node.num_rollouts, node.parent.num_rollouts, sizes[node])
+            )
+
+        for node in choose_cold_subtrees(subtrees, self.num_alive - max_alive):
+            parent = node.parent
+            parent.children.remove(node)
+            parent.unvisited_moves.append(node.move)
+            stack = [node]
+            while stack:
+                freed = stack.pop()
+                if freed._game_state is not None:
+                    self.num_states -= 1
+                self.recent.pop(freed, None)
+                stack.extend(freed.children)
+            self.num_pruned += sizes[node]
+
 
 class MCTSNode:
+    __slots__ = (
+        "tree",
+        "parent",
+        "move",
+        "next_player",
+        "win_counts",
+        "num_rollouts",
+        "amaf_win_counts",
+        "amaf_rollouts",
+        "children",
+        "_game_state",
+        "_unvisited_moves",
+    )
+
     def __init__(
-        self, game_state: GameState, parent: Optional["MCTSNode"] = None, move=None
+        self,
+        game_state: Optional[GameState],
+        parent: Optional["MCTSNode"] = None,
+        move: Optional[Move] = None,
+        max_states: int = DEFAULT_MAX_STATES,
     ):
-        self.game_state = game_state
+        # only the root is required to carry a game state; everybody else
+        # gets theirs by replaying moves from the closest ancestor that has
+        # one (see `game_state`)
+        if parent is None:
+            assert game_state
+            self.tree = MCTSTree(max_states)
+            self.tree.root = self
+            self.next_player = game_state.next_player
+        else:
+            self.tree = parent.tree
+            self.next_player = parent.next_player.other
+        self.tree.num_allocated += 1
+        self._game_state = game_state
         self.parent = parent
         self.move = move
         self.win_counts = {
@@ -17,14 +185,59 @@ class MCTSNode:
             Player.white: 0,
         }
         self.num_rollouts = 0
+        # all-moves-as-first statistics: rollouts through our parent in which
+        # our move was played later on by the same player, see MCTSAgent.rave
+        self.amaf_win_counts = {
+            Player.black: 0,
+            Player.white: 0,
+        }
+        self.amaf_rollouts = 0
         self.children: List["MCTSNode"] = []
-        self.unvisited_moves = game_state.legal_moves()
+        self._unvisited_moves: Optional[List[Move]] = None
+
+    @property
+    def game_state(self) -> GameState:
+        if self._game_state is not None:
+            return self._game_state
+
+        recent = self.tree.recent
+        path = []
+        node = self
+        while node._game_state is None and node not in recent:
+            path.append(node)
+            assert node.parent
+            node = node.parent
+        if node._game_state is not None:
+            game_state = node._game_state
+        else:
+            game_state = recent[node]
+            recent.move_to_end(node)
+        for node in reversed(path):
+            assert node.move
+            game_state = game_state.apply_move(node.move)
+        self.tree.remember(self, game_state)
+        return game_state
+
+    @property
+    def unvisited_moves(self) -> List[Move]:
+        if self._unvisited_moves is None:
+            # we only get here when a node is about to be expanded, and nodes
+            # get expanded roughly from the top of the tree down, so handing
+            # out the state budget first-come first-served keeps it on the
+            # hottest part of the tree
+            game_state = self.game_state
+            self._unvisited_moves = game_state.legal_moves()
+            tree = self.tree
+            if self._game_state is None and tree.num_states < tree.max_states:
+                self._game_state = game_state
+                tree.num_states += 1
+                tree.recent.pop(self, None)
+        return self._unvisited_moves
 
     def add_random_child(self) -> "MCTSNode":
         index = random.randint(0, len(self.unvisited_moves) - 1)
         new_move = self.unvisited_moves.pop(index)
-        new_game_state = self.game_state.apply_move(new_move)
-        new_node = MCTSNode(new_game_state, self, new_move)
+        new_node = MCTSNode(None, self, new_move)
         self.children.append(new_node)
         return new_node
 
@@ -32,11 +245,31 @@ class MCTSNode:
         self.win_counts[winner] += 1
         self.num_rollouts += 1
 
+    def record_amaf(self, winner: Player):
+        self.amaf_win_counts[winner] += 1
+        self.amaf_rollouts += 1
+
     def can_add_child(self) -> bool:
         return len(self.unvisited_moves) > 0
 
     def is_terminal(self) -> bool:
-        return self.game_state.is_over()
+        # worked out from the moves where possible, so that walking through
+        # the tree doesn't have to materialize every state along the way
+        if self.parent is None:
+            return self.game_state.is_over()
+        assert self.move
+        if self.move.is_resign:
+            return True
+        if not self.move.is_pass:
+            return False
+        if self.parent.parent is None:
+            previous_move = self.parent.game_state.last_move
+        else:
+            previous_move = self.parent.move
+        return previous_move is not None and previous_move.is_pass
 
     def winning_frac(self, player: Player) -> float:
         return float(self.win_counts[player]) / self.num_rollouts
+
+    def amaf_winning_frac(self, player: Player) -> float:
+        return float(self.amaf_win_counts[player]) / self.amaf_rollouts
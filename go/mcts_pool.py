@@ -0,0 +1,363 @@
+from array import array
+import random
+from typing import Dict, List, Optional
+
+from go.goboard import GameState
+from go.gotypes import PASS, RESIGN, Move, Player, decode_move, encode_move
+from go.mcts import DEFAULT_MAX_STATES, choose_cold_subtrees
+
+# A struct-of-arrays alternative to MCTSNode. Every node is an index into a
+# handful of typed arrays instead of a Python object holding a GameState, a
+# win_counts dict and two lists, which gets us from kilobytes per node down to
+# a couple dozen bytes.
+#
+# Moves are stored with go.gotypes.encode_move, plus NO_MOVE for the root,
+# which wasn't reached by a move in the tree.
+NO_MOVE = -3
+
+NO_NODE = -1
+
+CHUNK_SIZE = 4096
+
+
+class MCTSNodePool:
+    """MCTSNodePool:
+    A whole MCTS tree stored in preallocated typed arrays that grow a chunk
+    at a time.
+
+    Nodes don't keep their game state; it's rebuilt by replaying moves from
+    the closest materialized ancestor as the search descends (see
+    PooledNode.game_state). Up to `max_states` states of expanded nodes are
+    kept around, and unvisited moves are only stored for nodes that are
+    partially expanded.
+    """
+
+    def __init__(
+        self,
+        game_state: GameState,
+        chunk_size: int = CHUNK_SIZE,
+        max_states: int = DEFAULT_MAX_STATES,
+    ):
+        self.root_state = game_state
+        self.max_states = max_states
+        self.states: Dict[int, GameState] = {}
+        self.num_cols = game_state.board.num_cols
+        self.chunk_size = chunk_size
+        self.capacity = 0
+        # slots handed out so far; pruned slots go on the free list and get
+        # reused before we grow
+        self.size = 0
+        self._free = array("i")
+        self.num_allocated = 0
+        self.num_pruned = 0
+
+        self.parent = array("i")
+        self.move = array("h")
+        self.visits = array("i")
+        self.black_wins = array("i")
+        self.amaf_visits = array("i")
+        self.amaf_black_wins = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self._grow()
+
+        # unvisited move codes for nodes that have been asked for them but
+        # aren't fully expanded yet
+        self._unvisited: Dict[int, array] = {}
+
+        self._alloc(NO_NODE, NO_MOVE)
+
+    def _grow(self):
+        chunk = [0] * self.chunk_size
+        empty = [NO_NODE] * self.chunk_size
+        self.parent.extend(empty)
+        self.move.extend(chunk)
+        self.visits.extend(chunk)
+        self.black_wins.extend(chunk)
+        self.amaf_visits.extend(chunk)
+        self.amaf_black_wins.extend(chunk)
+        self.first_child.extend(empty)
+        self.next_sibling.extend(empty)
+        self.capacity += self.chunk_size
+
+    def _alloc(self, parent: int, move: int) -> int:
+        if self._free:
+            index = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            index = self.size
+            self.size += 1
+        self.num_allocated += 1
+
+        self.parent[index] = parent
+        self.move[index] = move
+        self.visits[index] = 0
+        self.black_wins[index] = 0
+        self.amaf_visits[index] = 0
+        self.amaf_black_wins[index] = 0
+        self.first_child[index] = NO_NODE
+        self.next_sibling[index] = NO_NODE
+        if parent != NO_NODE:
+            # push the new node onto the front of the parent's child list
+            self.next_sibling[index] = self.first_child[parent]
+            self.first_child[parent] = index
+        return index
+
+    @property
+    def num_alive(self) -> int:
+        return self.num_allocated - self.num_pruned
+
+    def _children(self, index: int) -> List[int]:
+        children = []
+        child = self.first_child[index]
+        while child != NO_NODE:
+            children.append(child)
+            child = self.next_sibling[child]
+        return children
+
+    def prune(self, max_alive: int):
+        """prune:
+        Free the least-visited subtrees until at most max_alive nodes are
+        left, the same way MCTSTree.prune does, including keeping the
+        root's most-visited and best-scoring children. Freed slots are
+        reused by later allocations.
+        """
+        if self.num_alive <= max_alive:
+            return
+
+        order = []
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            order.append(index)
+            stack.extend(self._children(index))
+        sizes = {}
+        for index in reversed(order):
+            sizes[index] = 1 + sum(sizes[child] for child in self._children(index))
+
+        visits = self.visits
+        parents = self.parent
+        keep = set()
+        root_children = self._children(0)
+        if root_children:
+            keep.add(max(root_children, key=lambda child: visits[child]))
+        visited = [child for child in root_children if visits[child] > 0]
+        if visited:
+            black_wins = self.black_wins
+            black = self.root_state.next_player == Player.black
+
+            def winning_frac(child: int) -> float:
+                wins = black_wins[child] if black else visits[child] - black_wins[child]
+                return wins / visits[child]
+
+            keep.add(max(visited, key=winning_frac))
+        subtrees = [
+            (index, visits[index], visits[parents[index]], sizes[index])
+            for index in order[1:]
+            if index not in keep
+        ]
+
+        for index in choose_cold_subtrees(subtrees, self.num_alive - max_alive):
+            parent = parents[index]
+            # unlink from the parent's child list
+            if self.first_child[parent] == index:
+                self.first_child[parent] = self.next_sibling[index]
+            else:
+                sibling = self.first_child[parent]
+                while self.next_sibling[sibling] != index:
+                    sibling = self.next_sibling[sibling]
+                self.next_sibling[sibling] = self.next_sibling[index]
+
+            unvisited = self._unvisited.get(parent)
+            if unvisited is None:
+                unvisited = self._unvisited[parent] = array("h")
+            unvisited.append(self.move[index])
+
+            stack = [index]
+            while stack:
+                freed = stack.pop()
+                stack.extend(self._children(freed))
+                self._unvisited.pop(freed, None)
+                self.states.pop(freed, None)
+                self._free.append(freed)
+            self.num_pruned += sizes[index]
+
+    @property
+    def root(self) -> "PooledNode":
+        return PooledNode(self, 0, None, self.root_state.next_player, self.root_state)
+
+    def nbytes(self) -> int:
+        """approximate bytes used by the node arrays and unvisited moves"""
+        arrays = (
+            self.parent,
+            self.move,
+            self.visits,
+            self.black_wins,
+            self.amaf_visits,
+            self.amaf_black_wins,
+            self.first_child,
+            self.next_sibling,
+        )
+        total = sum(a.itemsize * len(a) for a in arrays)
+        total += self._free.itemsize * len(self._free)
+        total += sum(a.itemsize * len(a) for a in self._unvisited.values())
+        return total
+
+
+class PooledNode:
+    """PooledNode:
+    A short-lived handle onto a node in an MCTSNodePool with the same
+    interface as MCTSNode, so MCTSAgent can drive either one.
+
+    Handles are created on the way down the tree and remember the handle they
+    came from, which is what lets the game state be replayed incrementally
+    instead of from the root every time.
+    """
+
+    __slots__ = ("pool", "index", "parent", "next_player", "_game_state")
+
+    def __init__(
+        self,
+        pool: MCTSNodePool,
+        index: int,
+        parent: Optional["PooledNode"],
+        next_player: Player,
+        game_state: Optional[GameState] = None,
+    ):
+        self.pool = pool
+        self.index = index
+        self.parent = parent
+        self.next_player = next_player
+        self._game_state = game_state
+
+    @property
+    def tree(self) -> MCTSNodePool:
+        return self.pool
+
+    @property
+    def move(self) -> Optional[Move]:
+        code = self.pool.move[self.index]
+        if code == NO_MOVE:
+            return None
+        return decode_move(code, self.pool.num_cols)
+
+    @property
+    def game_state(self) -> GameState:
+        if self._game_state is None:
+            # walk up to the closest handle that has a state, then replay the
+            # moves back down, keeping each state on its handle
+            states = self.pool.states
+            path = []
+            node = self
+            while True:
+                game_state = node._game_state or states.get(node.index)
+                if game_state is not None:
+                    break
+                path.append(node)
+                assert node.parent
+                node = node.parent
+            for node in reversed(path):
+                move = node.move
+                assert move
+                game_state = game_state.apply_move(move)
+                node._game_state = game_state
+            self._game_state = game_state
+        assert self._game_state
+        return self._game_state
+
+    @property
+    def children(self) -> List["PooledNode"]:
+        pool = self.pool
+        children = []
+        next_player = self.next_player.other
+        child = pool.first_child[self.index]
+        while child != NO_NODE:
+            children.append(PooledNode(pool, child, self, next_player))
+            child = pool.next_sibling[child]
+        return children
+
+    @property
+    def num_rollouts(self) -> int:
+        return self.pool.visits[self.index]
+
+    @property
+    def amaf_rollouts(self) -> int:
+        return self.pool.amaf_visits[self.index]
+
+    def _unvisited_moves(self) -> Optional[array]:
+        pool = self.pool
+        unvisited = pool._unvisited.get(self.index)
+        if unvisited is None and pool.first_child[self.index] == NO_NODE:
+            # first time we've been asked: legal_moves always includes pass
+            # and resign, so this is never empty
+            game_state = self.game_state
+            unvisited = array(
+                "h",
+                [encode_move(move, pool.num_cols) for move in game_state.legal_moves()],
+            )
+            pool._unvisited[self.index] = unvisited
+            # same first-come first-served budget as MCTSNode, which keeps the
+            # materialized states near the top of the tree
+            if len(pool.states) < pool.max_states:
+                pool.states[self.index] = game_state
+        return unvisited
+
+    def add_random_child(self) -> "PooledNode":
+        pool = self.pool
+        unvisited = self._unvisited_moves()
+        assert unvisited
+
+        # swap-remove a random unvisited move
+        i = random.randrange(len(unvisited))
+        code = unvisited[i]
+        unvisited[i] = unvisited[-1]
+        unvisited.pop()
+        if not unvisited:
+            del pool._unvisited[self.index]
+
+        index = pool._alloc(self.index, code)
+        return PooledNode(pool, index, self, self.next_player.other)
+
+    def record_win(self, winner: Player):
+        self.pool.visits[self.index] += 1
+        if winner == Player.black:
+            self.pool.black_wins[self.index] += 1
+
+    def record_amaf(self, winner: Player):
+        self.pool.amaf_visits[self.index] += 1
+        if winner == Player.black:
+            self.pool.amaf_black_wins[self.index] += 1
+
+    def can_add_child(self) -> bool:
+        unvisited = self._unvisited_moves()
+        return unvisited is not None and len(unvisited) > 0
+
+    def is_terminal(self) -> bool:
+        # worked out from the moves alone, so that walking through the middle
+        # of the tree never has to materialize a game state
+        pool = self.pool
+        code = pool.move[self.index]
+        if code == NO_MOVE:
+            return pool.root_state.is_over()
+        if code == RESIGN:
+            return True
+        if code != PASS:
+            return False
+        parent = pool.parent[self.index]
+        if parent == 0:
+            last_move = pool.root_state.last_move
+            return last_move is not None and last_move.is_pass
+        return pool.move[parent] == PASS
+
+    def winning_frac(self, player: Player) -> float:
+        visits = self.pool.visits[self.index]
+        black_wins = self.pool.black_wins[self.index]
+        wins = black_wins if player == Player.black else visits - black_wins
+        return float(wins) / visits
+
+    def amaf_winning_frac(self, player: Player) -> float:
+        visits = self.pool.amaf_visits[self.index]
+        black_wins = self.pool.amaf_black_wins[self.index]
+        wins = black_wins if player == Player.black else visits - black_wins
+        return float(wins) / visits
@@ -0,0 +1,203 @@
+import random
+
+import pytest
+
+from go.agent.mcts import MCTSAgent, SearchStats
+from go.goboard import GameState
+from go.gotypes import Move, Player, Point, decode_move, encode_move
+from go.mcts import MCTSNode
+from go.mcts_pool import MCTSNodePool
+
+
+def test_move_codes_roundtrip():
+    for move in [Move.pass_turn(), Move.resign(), Move.play(Point(3, 4))]:
+        decoded = decode_move(encode_move(move, 5), 5)
+        assert decoded.is_pass == move.is_pass
+        assert decoded.is_resign == move.is_resign
+        assert decoded.point == move.point
+
+
+def test_pool_grows_in_chunks():
+    pool = MCTSNodePool(GameState.new_game(5), chunk_size=4)
+    root = pool.root
+    for _ in range(10):
+        root.add_random_child()
+    assert pool.size == 11
+    assert pool.capacity == 12
+    assert len(root.children) == 10
+
+
+def test_backends_agree_on_rollout_counts():
+    for tree in ["node", "pool"]:
+        random.seed(1)
+        agent = MCTSAgent(8, 1.5, tree=tree)
+        game = GameState.new_game(5)
+        move = agent.select_move(game)
+        assert game.is_valid_move(move)
+
+        root = agent.new_root(game)
+        for _ in range(5):
+            child = root.add_random_child()
+            child.record_win(agent.simulate_random_game(child.game_state))
+        assert sum(c.num_rollouts for c in root.children) == 5
+
+
+def test_lazy_states_respect_budget():
+    random.seed(2)
+    game = GameState.new_game(5)
+    root = MCTSNode(game, max_states=1)
+    node = root
+    expected = game
+    for _ in range(4):
+        node = node.add_random_child()
+        assert node.move
+        expected = expected.apply_move(node.move)
+    assert node.game_state.board.zobrist_hash() == expected.board.zobrist_hash()
+    assert node.game_state.next_player == node.next_player
+    assert root.tree.num_states == 1
+
+
+def test_replayed_states_are_reused_past_budget(monkeypatch):
+    random.seed(5)
+    root = MCTSNode(GameState.new_game(5), max_states=0)
+    node = root
+    for _ in range(10):
+        node = node.add_random_child()
+    node.game_state
+
+    replays = []
+    apply_move = GameState.apply_move
+    monkeypatch.setattr(
+        GameState,
+        "apply_move",
+        lambda self, move: replays.append(move) or apply_move(self, move),
+    )
+    # expanding asks for the leaf's state and then its new child's, which is
+    # one move on from the leaf rather than eleven from the root
+    child = node.add_random_child()
+    child.game_state
+    assert len(replays) == 1
+    assert root.tree.num_states == 0
+
+
+def test_prune_keeps_tree_under_cap():
+    for tree in ["node", "pool"]:
+        random.seed(3)
+        agent = MCTSAgent(12, 1.5, tree=tree, max_nodes=6)
+        agent.select_move(GameState.new_game(4))
+        stats = agent.last_stats
+        assert stats.rounds == 12
+        assert stats.nodes_allocated == 13
+        assert stats.nodes_pruned > 0
+        assert stats.nodes_alive == stats.nodes_allocated - stats.nodes_pruned
+        assert stats.nodes_alive <= 6
+
+
+def test_tiny_max_nodes_still_picks_a_move():
+    for tree in ["node", "pool"]:
+        random.seed(6)
+        agent = MCTSAgent(30, 1.5, tree=tree, max_nodes=2)
+        game = GameState.new_game(5)
+        assert game.is_valid_move(agent.select_move(game))
+        assert agent.last_stats.nodes_alive <= 3
+
+    with pytest.raises(ValueError):
+        MCTSAgent(30, 1.5, max_nodes=1)
+
+
+def test_prune_keeps_the_move_we_would_play():
+    for tree in ["node", "pool"]:
+        random.seed(7)
+        agent = MCTSAgent(1, 1.5, tree=tree)
+        root = agent.new_root(GameState.new_game(5))
+        children = [root.add_random_child() for _ in range(6)]
+        # the most-visited child is losing, the best-scoring one barely tried
+        for child in children:
+            for _ in range(3):
+                child.record_win(Player.white)
+        for _ in range(10):
+            children[0].record_win(Player.white)
+        children[1].record_win(Player.black)
+        for _ in range(3):
+            children[1].record_win(Player.black)
+        for child in children:
+            for _ in range(child.num_rollouts):
+                root.record_win(Player.white)
+        assert children[1].winning_frac(Player.black) > 0.5
+
+        root.tree.prune(1)
+        points = [child.move.point for child in root.children if child.move]
+        assert len(points) == 2
+        assert children[0].move and children[1].move
+        assert children[0].move.point in points
+        assert children[1].move.point in points
+
+
+def test_rave_records_amaf_for_later_moves():
+    for tree in ["node", "pool"]:
+        random.seed(4)
+        agent = MCTSAgent(1, 1.5, tree=tree, rave=True)
+        root = agent.new_root(GameState.new_game(5))
+        plays = []
+        while len(plays) < 3:
+            child = root.add_random_child()
+            if child.move and child.move.is_play:
+                plays.append(child)
+        first, second, third = plays
+        assert first.move and second.move and third.move
+
+        # black played `first` in the tree, then white played `third`'s point
+        # and black `second`'s in the rollout. Black playing `third`'s point
+        # later on (after a capture, say) doesn't count, since white got
+        # there first
+        rollout = [
+            Move.play(third.move.point),
+            Move.play(second.move.point),
+            Move.pass_turn(),
+            Move.play(third.move.point),
+        ]
+        agent.record_amaf([root, first], rollout, Player.black)
+
+        amaf = {c.move.point: c.amaf_rollouts for c in root.children if c.move}
+        assert amaf[first.move.point] == 1
+        assert amaf[second.move.point] == 1
+        assert amaf[third.move.point] == 0
+        assert sum(amaf.values()) == 2
+
+
+def test_early_stop_saves_rounds_once_decided():
+    agent = MCTSAgent(100, 1.5, early_stop=True)
+    root = agent.new_root(GameState.new_game(3))
+    while root.can_add_child():
+        root.add_random_child()
+    for child in root.children:
+        for _ in range(5):
+            child.record_win(Player.white)
+    leader = root.children[0]
+    for _ in range(50):
+        leader.record_win(Player.black)
+
+    assert agent.move_is_decided(root, Player.black, 4)
+    assert not agent.move_is_decided(root, Player.black, 60)
+    agent.early_stop_confidence = 0.99
+    assert agent.move_is_decided(root, Player.black, 60)
+
+
+def test_rollouts_are_capped():
+    agent = MCTSAgent(1, 1.5, max_rollout_moves=3)
+    game = GameState.new_game(5)
+    moves = []
+    agent.simulate_random_game(game, moves)
+    assert len(moves) == 3
+    assert agent.last_stats.rollouts_capped == 1
+    assert agent.last_stats.rollout_histogram() == [(0, 1)]
+
+
+def test_rollout_length_summary():
+    stats = SearchStats()
+    stats.rollout_lengths.update({10: 5, 20: 4, 100: 1})
+    assert stats.mean_rollout_length() == 23.0
+    assert stats.rollout_percentile(0.5) == 10
+    assert stats.rollout_percentile(0.9) == 20
+    assert stats.rollout_percentile(1.0) == 100
+    assert "median 10, 90th percentile 20, longest 100" in str(stats)
@@ -0,0 +1,125 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Type
+
+import numpy as np
+from numpy import typing as nptype
+from scipy.special import expit
+
+# Every activation here has a derivative you can get back from its output
+# alone, so backward works from the output forward already computed rather
+# than evaluating the function again. Both directions write into `out` and
+# build their results up in place, see ActivationLayer.
+
+
+class Activation(ABC):
+    name = ""
+
+    @abstractmethod
+    def forward(self, z: nptype.NDArray, out: nptype.NDArray) -> nptype.NDArray:
+        """the activation of z, written to out"""
+        ...
+
+    @abstractmethod
+    def backward(
+        self,
+        z: nptype.NDArray,
+        a: nptype.NDArray,
+        delta: nptype.NDArray,
+        out: nptype.NDArray,
+    ) -> nptype.NDArray:
+        """backward:
+        delta times the derivative at z, written to out. `a` is what forward
+        returned for z.
+        """
+        ...
+
+
+class Sigmoid(Activation):
+    name = "sigmoid"
+
+    def forward(self, z, out):
+        return expit(z, out=out)
+
+    def backward(self, z, a, delta, out):
+        # sigmoid' = a * (1 - a)
+        np.subtract(1, a, out=out)
+        out *= a
+        out *= delta
+        return out
+
+
+class Tanh(Activation):
+    name = "tanh"
+
+    def forward(self, z, out):
+        return np.tanh(z, out=out)
+
+    def backward(self, z, a, delta, out):
+        # tanh' = 1 - a^2
+        np.multiply(a, a, out=out)
+        np.subtract(1, out, out=out)
+        out *= delta
+        return out
+
+
+class ReLU(Activation):
+    name = "relu"
+
+    def forward(self, z, out):
+        return np.maximum(z, 0, out=out)
+
+    def backward(self, z, a, delta, out):
+        # a is never negative, so its sign is the derivative: 1 where z > 0
+        # and 0 everywhere else
+        np.sign(a, out=out)
+        out *= delta
+        return out
+
+
+class LeakyReLU(Activation):
+    name = "leaky_relu"
+
+    def __init__(self, slope: float = 0.01):
+        assert 0 < slope < 1
+        self.slope = slope
+
+    def forward(self, z, out):
+        # with 0 < slope < 1 the larger of z and slope * z is the right one
+        np.multiply(z, self.slope, out=out)
+        return np.maximum(z, out, out=out)
+
+    def backward(self, z, a, delta, out):
+        # a > 0 exactly where z > 0, so max(sign(a), 0) is 1 there and 0
+        # elsewhere, which gets scaled to 1 and slope respectively
+        np.sign(a, out=out)
+        np.maximum(out, 0, out=out)
+        out *= 1 - self.slope
+        out += self.slope
+        out *= delta
+        return out
+
+
+class Softplus(Activation):
+    name = "softplus"
+
+    def forward(self, z, out):
+        # log(1 + e^z), without overflowing for large z
+        return np.logaddexp(0, z, out=out)
+
+    def backward(self, z, a, delta, out):
+        # softplus' is sigmoid(z), and e^a = 1 + e^z makes that 1 - e^-a;
+        # expm1 keeps it accurate when a is tiny
+        np.negative(a, out=out)
+        np.expm1(out, out=out)
+        np.negative(out, out=out)
+        out *= delta
+        return out
+
+
+ACTIVATIONS: Dict[str, Type[Activation]] = {
+    cls.name: cls for cls in (Sigmoid, Tanh, ReLU, LeakyReLU, Softplus)
+}
+
+
+def get_activation(name: str) -> Activation:
+    return ACTIVATIONS[name]()
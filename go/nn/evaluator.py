@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import suppress
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy import typing as nptype
+
+# a pending request: one input column and where to send its output
+Request = Tuple[nptype.NDArray, "asyncio.Future[nptype.NDArray]"]
+
+
+class BatchedEvaluator:
+    """BatchedEvaluator:
+    Collects inputs from any number of coroutines and runs them through the
+    model in a single forward pass.
+
+    `model` is anything with a `single_forward` that takes a (features,
+    batch) matrix and returns an (outputs, batch) one, which is what
+    SequentialNetwork does when you hand it more than one column. A batch is
+    sent as soon as it has max_batch_size inputs, or max_wait seconds after
+    the first one showed up.
+
+    Use it as an async context manager so the batching task is running:
+
+        async with BatchedEvaluator(net) as evaluator:
+            output = await evaluator.evaluate(x)
+    """
+
+    def __init__(self, model, max_batch_size: int = 16, max_wait: float = 0.001):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.num_batches = 0
+        self.num_requests = 0
+        self._queue: Optional["asyncio.Queue[Request]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def __aenter__(self) -> "BatchedEvaluator":
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        assert self._task
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def evaluate(self, x: nptype.NDArray) -> nptype.NDArray:
+        """run a single input through the model, flattened to a column"""
+        assert self._queue, "BatchedEvaluator used outside of `async with`"
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((x.reshape(-1), future))
+        return await future
+
+    async def _run(self):
+        assert self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Request] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._forward(batch)
+
+    def _forward(self, batch: List[Request]):
+        xs = np.stack([x for x, _ in batch], axis=1)
+        try:
+            outputs = self.model.single_forward(xs)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.num_batches += 1
+        self.num_requests += len(batch)
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(outputs[:, i])
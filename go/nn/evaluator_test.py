@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+
+from go.nn.evaluator import BatchedEvaluator
+
+
+class DoublingModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def single_forward(self, x):
+        self.batch_sizes.append(x.shape[1])
+        return 2 * x
+
+
+def test_requests_are_batched():
+    model = DoublingModel()
+
+    async def run():
+        async with BatchedEvaluator(model, max_batch_size=4, max_wait=1) as ev:
+            xs = [np.full((2, 1), i, dtype=float) for i in range(8)]
+            return await asyncio.gather(*(ev.evaluate(x) for x in xs))
+
+    results = asyncio.run(run())
+    assert model.batch_sizes == [4, 4]
+    for i, result in enumerate(results):
+        assert np.array_equal(result, [2 * i, 2 * i])
+
+
+class SumModel:
+    """each output column is its input column's sum, so results can't be
+    mixed up between callers without it showing"""
+
+    def single_forward(self, x):
+        return np.sum(x, axis=0, keepdims=True)
+
+
+def test_results_go_to_the_right_callers():
+    async def caller(ev, i):
+        # stagger the callers so the batches come out uneven
+        await asyncio.sleep(0.001 * (i % 3))
+        return i, await ev.evaluate(np.full(4, i, dtype=float))
+
+    async def run():
+        async with BatchedEvaluator(SumModel(), max_batch_size=3, max_wait=0) as ev:
+            results = await asyncio.gather(*(caller(ev, i) for i in range(10)))
+            return results, ev.num_batches
+
+    results, num_batches = asyncio.run(run())
+    assert num_batches >= 4
+    for i, result in results:
+        assert np.array_equal(result, [4 * i])
@@ -1,13 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import Optional, TypeVar
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar, Union
 import random
 
 import numpy as np
 from numpy import typing as nptype
 from scipy.special import expit
 
+from go.nn.activations import Activation, get_activation
 from go.nn.mnist import Feature, FeatureList
 
+# applied to each training sample as it's drawn into a mini-batch, e.g. a
+# go.encoders.symmetry.DihedralAugmenter
+Transform = Callable[[Feature], Feature]
+
+# Parameters, activations and deltas are all kept in one float dtype per
+# network. float32 is plenty for training these and moves half the bytes of
+# float64 through every matrix product; inputs can be stored as anything
+# (uint8, float16, ...) and are cast a mini-batch at a time.
+DEFAULT_DTYPE = np.float32
+
+# a mini-batch as (features, batch) and (outputs, batch) matrices, a sample
+# per column
+Batch = Tuple[np.ndarray, np.ndarray]
+
+# Training data is either a FeatureList, which gets shuffled in place, or
+# something that yields (x, y) mini-batches of stacked samples every time it's
+# iterated over, like go.data.loader.DataLoader
+TrainingData = Union[FeatureList, Iterable[Tuple[np.ndarray, np.ndarray]]]
+
 
 class Layer:
     def __init__(self):
@@ -19,13 +39,33 @@ class Layer:
 
         # Each layer can persist data flowing into and out of it in the forward
         # pass
-        self.input_data = None
-        self.output_data = None
+        self.input_data: Optional[nptype.NDArray[np.floating]] = None
+        self.output_data: Optional[nptype.NDArray[np.floating]] = None
 
         # Analogously, a layer holds input and output data for the backward
         # pass
-        self.input_delta: Optional[nptype.NDArray[np.float64]] = None
-        self.output_delta: Optional[nptype.NDArray[np.float64]] = None
+        self.input_delta: Optional[nptype.NDArray[np.floating]] = None
+        self.output_delta: Optional[nptype.NDArray[np.floating]] = None
+
+        # scratch arrays, see _buffer
+        self._buffers: Dict[str, np.ndarray] = {}
+
+    def _buffer(
+        self, name: str, shape: Tuple[int, ...], dtype: nptype.DTypeLike
+    ) -> np.ndarray:
+        """_buffer:
+        An array to write into with out= or in place, allocated the first
+        time it's asked for and handed back on every call after that with
+        the same shape and dtype. Mini-batches are nearly always the same
+        size, so a layer ends up allocating its outputs and deltas once
+        rather than on every pass. Its contents are only good until the next
+        pass through the layer.
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
 
     def connect(self, layer: "Layer"):
         self.previous = layer
@@ -37,7 +77,7 @@ class Layer:
 
     # input_data is reserved for the first layer; all others get their input
     # from the previous output
-    def get_forward_input(self) -> nptype.NDArray[np.float64]:
+    def get_forward_input(self) -> nptype.NDArray[np.floating]:
         if self.previous:
             return self.previous.output_data
         else:
@@ -50,7 +90,7 @@ class Layer:
 
     # input delta is reserved for the last layer; all other layers get their
     # error terms from their successor
-    def get_backward_input(self) -> nptype.NDArray[np.float64]:
+    def get_backward_input(self) -> nptype.NDArray[np.floating]:
         if self.next:
             return self.next.output_delta
         else:
@@ -68,6 +108,11 @@ class Layer:
         # - why can't we raise a NotImplementedError?
         pass
 
+    # convert any parameters to the given float dtype; SequentialNetwork
+    # calls this on every layer it's given
+    def set_dtype(self, dtype: nptype.DTypeLike):
+        pass
+
     def describe(self):
         raise NotImplementedError
 
@@ -86,8 +131,10 @@ def sigmoid_scalar(x: nptype.ArrayLike) -> nptype.ArrayLike:
     return 1.0 / (1.0 + np.exp(-x))
 
 
+# these used to np.vectorize the scalar versions, which is a python loop over
+# every element; expit is the same function as a ufunc
 def sigmoid(z: nptype.NDArray[T]) -> nptype.NDArray[T]:
-    return np.vectorize(sigmoid_scalar)(z)
+    return expit(z)
 
 
 # same type issues here as above
@@ -97,44 +144,61 @@ def sigmoid_prime_scalar(x: nptype.ArrayLike) -> nptype.ArrayLike:
 
 
 def sigmoid_prime(z: nptype.ArrayLike) -> nptype.ArrayLike:
-    return np.vectorize(sigmoid_prime_scalar)(z)
+    e = expit(z)
+    return e * (1 - e)
 
 
 def sigmoid_prime_scipy(z: nptype.ArrayLike) -> nptype.ArrayLike:
     return expit(z) * (1 - expit(z))
 
 
-# an activation layer using the sigmoid function to activate neurons
+# an activation layer, applying one of go.nn.activations element-wise. It
+# uses the sigmoid function to activate neurons unless told otherwise
 class ActivationLayer(Layer):
-    def __init__(self, input_dim: int):
+    def __init__(self, input_dim: int, activation: Union[str, Activation] = "sigmoid"):
         super(ActivationLayer, self).__init__()
 
         self.input_dim = input_dim
         self.output_dim = input_dim
+        if isinstance(activation, str):
+            activation = get_activation(activation)
+        self.activation = activation
 
     def forward(self):
         data = self.get_forward_input()
-        # The forward pass is simply applying the sigmoid to the input data
-        self.output_data = expit(data)
+        # The forward pass is simply applying the activation to the input data
+        self.output_data = self.activation.forward(
+            data, out=self._buffer("output_data", data.shape, data.dtype)
+        )
 
     def backward(self):
         delta = self.get_backward_input()
         data = self.get_forward_input()
         # The backward pass is element-wise multiplication of the error term
-        # with the sigmoid derivative evaluated at the input to this layer
-        # self.output_delta = delta * sigmoid_prime_scipy(data)
-        #
-        # inlining for efficiency, and using scipy
-        e = expit(data)
-        self.output_delta = delta * e * (1 - e)
+        # with the activation's derivative evaluated at the input to this
+        # layer. Activations work that out from the output of the forward
+        # pass where they can, e.g. sigmoid' is just e * (1 - e)
+        assert self.output_data is not None
+        self.output_delta = self.activation.backward(
+            data,
+            self.output_data,
+            delta,
+            out=self._buffer("output_delta", data.shape, data.dtype),
+        )
 
     def describe(self):
         print(f"|-- {self.__class__.__name__}")
         print(f"  |-- dimensions: ({self.input_dim}, {self.output_dim})")
+        print(f"  |-- activation: {self.activation.name}")
 
 
 class DenseLayer(Layer):
-    def __init__(self, input_dim: int, output_dim: int):
+    def __init__(
+        self,
+        input_dim: int,
+        output_dim: int,
+        dtype: nptype.DTypeLike = DEFAULT_DTYPE,
+    ):
         super(DenseLayer, self).__init__()
 
         self.input_dim = input_dim
@@ -144,20 +208,28 @@ class DenseLayer(Layer):
         # more sophisticated ways to initialize parameters so that they more
         # accurately reflect the structure of your data, but this is an
         # acceptable baseline. More on this in chapter 6
-        self.weight = np.random.randn(output_dim, input_dim)
-        self.bias = np.random.randn(output_dim, 1)
+        self.weight = np.random.randn(output_dim, input_dim).astype(dtype)
+        self.bias = np.random.randn(output_dim, 1).astype(dtype)
 
         # the layer parameters consist of weights and bias terms
         self.params = [self.weight, self.bias]
 
-        self.delta_w = np.zeros(self.weight.shape)
-        self.delta_b = np.zeros(self.bias.shape)
+        self.delta_w = np.zeros_like(self.weight)
+        self.delta_b = np.zeros_like(self.bias)
+        # one mini-batch's gradients, before they're added to the deltas
+        self._grad_w = np.empty_like(self.weight)
+        self._grad_b = np.empty_like(self.bias)
 
     def forward(self):
         data = self.get_forward_input()
         # The forward pass of the dense layer is the affine-linear
         # transformation on input data defined by weights and biases
-        self.output_data = np.dot(self.weight, data) + self.bias
+        output = self._buffer(
+            "output_data", (self.output_dim, data.shape[1]), self.weight.dtype
+        )
+        np.dot(self.weight, data, out=output)
+        output += self.bias
+        self.output_data = output
 
     def backward(self):
         """
@@ -170,21 +242,42 @@ class DenseLayer(Layer):
         data = self.get_forward_input()
         delta = self.get_backward_input()
 
-        # The current delta is added to the bias delta
-        self.delta_b += delta
-        # Then you add this term to the weight delta
-        self.delta_w += np.dot(delta, data.transpose())
-        self.output_delta = np.dot(self.weight.transpose(), delta)
+        # The current delta is added to the bias delta. Each column of delta is
+        # a sample, so summing across them adds up the whole mini-batch
+        np.sum(delta, axis=1, keepdims=True, out=self._grad_b)
+        self.delta_b += self._grad_b
+        # Then you add this term to the weight delta; with a sample per column
+        # this one product is the sum of every sample's outer product
+        np.dot(delta, data.transpose(), out=self._grad_w)
+        self.delta_w += self._grad_w
+        self.output_delta = np.dot(
+            self.weight.transpose(),
+            delta,
+            out=self._buffer("output_delta", data.shape, self.weight.dtype),
+        )
 
     # the update rule for this layer is given by accumulating the deltas,
     # according to the learning rate you specify for your network
     def update_params(self, rate: float):
-        self.weight -= rate * self.delta_w
-        self.bias -= rate * self.delta_b
+        # the gradient scratch arrays are free between backward passes, so the
+        # scaled deltas go there rather than into temporaries
+        np.multiply(self.delta_w, rate, out=self._grad_w)
+        self.weight -= self._grad_w
+        np.multiply(self.delta_b, rate, out=self._grad_b)
+        self.bias -= self._grad_b
 
     def clear_deltas(self):
-        self.delta_w = np.zeros(self.weight.shape)
-        self.delta_b = np.zeros(self.bias.shape)
+        self.delta_w.fill(0)
+        self.delta_b.fill(0)
+
+    def set_dtype(self, dtype: nptype.DTypeLike):
+        self.weight = self.weight.astype(dtype, copy=False)
+        self.bias = self.bias.astype(dtype, copy=False)
+        self.params = [self.weight, self.bias]
+        self.delta_w = np.zeros_like(self.weight)
+        self.delta_b = np.zeros_like(self.bias)
+        self._grad_w = np.empty_like(self.weight)
+        self._grad_b = np.empty_like(self.bias)
 
     def describe(self):
         print(f"|-- {self.__class__.__name__}")
@@ -229,13 +322,19 @@ class MSE:
 
 
 class SequentialNetwork:
-    def __init__(self, loss: Optional[ErrorType] = None):
+    def __init__(
+        self,
+        loss: Optional[ErrorType] = None,
+        dtype: nptype.DTypeLike = DEFAULT_DTYPE,
+    ):
         print("Initializing network")
         self.layers = []
+        self.dtype = np.dtype(dtype)
         if loss is None:
             self.loss = MSE()
 
     def add(self, layer: Layer):
+        layer.set_dtype(self.dtype)
         self.layers.append(layer)
         layer.describe()
         if len(self.layers) > 1:
@@ -243,60 +342,96 @@ class SequentialNetwork:
 
     def train(
         self,
-        training_data: FeatureList,
+        training_data: TrainingData,
         epochs: int,
         mini_batch_size,
         learning_rate: float,
         test_data: Optional[FeatureList] = None,
+        transform: Optional[Transform] = None,
     ):
-        n = len(training_data)
         for epoch in range(epochs):
-            random.shuffle(training_data)
-            mini_batches = [
-                training_data[k : k + mini_batch_size]
-                for k in range(0, n, mini_batch_size)
-            ]
-            for mini_batch in mini_batches:
-                self.train_batch(mini_batch, learning_rate)
+            for x, y in self.mini_batches(training_data, mini_batch_size, transform):
+                self.train_batch(x, y, learning_rate)
             if test_data:
                 n_test = len(test_data)
                 print(f"Epoch {epoch}: {self.evaluate(test_data)} / {n_test}")
             else:
                 print(f"Epoch {epoch} completed")
 
-    def train_batch(self, mini_batch: FeatureList, learning_rate: float):
-        self.forward_backward(mini_batch)
-        self.update(mini_batch, learning_rate)
-
-    def update(self, mini_batch: FeatureList, learning_rate: float):
+    @staticmethod
+    def mini_batches(
+        training_data: TrainingData,
+        mini_batch_size: int,
+        transform: Optional[Transform] = None,
+    ) -> Iterator[Batch]:
+        """mini_batches:
+        One epoch's worth of mini-batches, as matrices with a sample per
+        column. A loader brings its own batch size and shuffling, so
+        mini_batch_size only applies to a FeatureList.
+        """
+        if isinstance(training_data, list):
+            random.shuffle(training_data)
+            n = len(training_data)
+            for k in range(0, n, mini_batch_size):
+                mini_batch = training_data[k : k + mini_batch_size]
+                if transform is not None:
+                    mini_batch = [transform(feature) for feature in mini_batch]
+                yield stack_features(mini_batch)
+            return
+        for x, y in training_data:
+            if transform is not None:
+                # transforms work on one sample at a time
+                mini_batch = [transform(feature) for feature in zip(x, y)]
+                x = np.stack([x for x, _ in mini_batch])
+                y = np.stack([y for _, y in mini_batch])
+            yield x.reshape(len(x), -1).T, y.reshape(len(y), -1).T
+
+    def train_batch(self, x: np.ndarray, y: np.ndarray, learning_rate: float):
+        self.forward_backward(x, y)
+        self.update(x.shape[1], learning_rate)
+
+    def update(self, batch_size: int, learning_rate: float):
         # a common technique is to normalize the learning rate by the
         # mini-batch size
-        learning_rate = learning_rate / len(mini_batch)
+        learning_rate = learning_rate / batch_size
 
         for layer in self.layers:
             layer.update_params(learning_rate)
         for layer in self.layers:
             layer.clear_deltas()
 
-    def forward_backward(self, mini_batch: FeatureList):
-        for x, y in mini_batch:
-            self.layers[0].input_data = x
-            for layer in self.layers:
-                layer.forward()
-            self.layers[-1].input_delta = self.loss.loss_derivative(
-                self.layers[-1].output_data, y
-            )
-            for layer in reversed(self.layers):
-                layer.backward()
-
-    def single_forward(self, x: Feature) -> np.ndarray:
-        self.layers[0].input_data = x
+    def forward_backward(self, x: np.ndarray, y: np.ndarray):
+        """forward_backward:
+        Accumulate the gradients for a whole mini-batch, given as (features,
+        batch) and (outputs, batch) matrices. Every layer works on all the
+        columns at once, so that's one matrix product per dense layer each
+        way rather than one per sample.
+        """
+        self.layers[0].input_data = x.astype(self.dtype, copy=False)
+        for layer in self.layers:
+            layer.forward()
+        self.layers[-1].input_delta = self.loss.loss_derivative(
+            self.layers[-1].output_data, y.astype(self.dtype, copy=False)
+        )
+        for layer in reversed(self.layers):
+            layer.backward()
+
+    def single_forward(self, x: np.ndarray) -> np.ndarray:
+        self.layers[0].input_data = x.astype(self.dtype, copy=False)
         for layer in self.layers:
             layer.forward()
-        return self.layers[-1].output_data
+        # layers reuse their output arrays, so hand back one that the next
+        # pass won't overwrite
+        return self.layers[-1].output_data.copy()
 
     def evaluate(self, test_data: FeatureList) -> int:
-        test_results = [
-            (np.argmax(self.single_forward(x)), np.argmax(y)) for (x, y) in test_data
-        ]
-        return sum(int(x == y) for (x, y) in test_results)
+        x, y = stack_features(test_data)
+        predictions = np.argmax(self.single_forward(x), axis=0)
+        return int(np.sum(predictions == np.argmax(y, axis=0)))
+
+
+def stack_features(features: FeatureList) -> Batch:
+    """a list of (x, y) column vectors as a pair of (features, batch) matrices"""
+    x = np.hstack([x.reshape(-1, 1) for x, _ in features])
+    y = np.hstack([y.reshape(-1, 1) for _, y in features])
+    return x, y
@@ -0,0 +1,75 @@
+import numpy as np
+
+from go.nn.layer import ActivationLayer, DenseLayer, SequentialNetwork
+
+
+def make_network() -> SequentialNetwork:
+    np.random.seed(0)
+    net = SequentialNetwork()
+    net.add(DenseLayer(6, 5))
+    net.add(ActivationLayer(5))
+    net.add(DenseLayer(5, 3))
+    net.add(ActivationLayer(3))
+    return net
+
+
+def test_batched_gradients_match_per_sample():
+    net = make_network()
+    rng = np.random.default_rng(1)
+    x = rng.random((6, 8))
+    y = rng.random((3, 8))
+
+    net.forward_backward(x, y)
+    batched = [
+        (layer.delta_w.copy(), layer.delta_b.copy()) for layer in net.layers[::2]
+    ]
+    for layer in net.layers[::2]:
+        layer.clear_deltas()
+
+    # one sample at a time, the way the network used to accumulate them
+    for i in range(x.shape[1]):
+        net.forward_backward(x[:, i : i + 1], y[:, i : i + 1])
+    for layer, (delta_w, delta_b) in zip(net.layers[::2], batched):
+        assert np.allclose(layer.delta_w, delta_w)
+        assert np.allclose(layer.delta_b, delta_b)
+
+
+def test_evaluate():
+    net = make_network()
+    test_data = [(np.random.rand(6, 1), np.eye(3)[:, [i % 3]]) for i in range(10)]
+    expected = sum(
+        int(np.argmax(net.single_forward(x)) == np.argmax(y)) for x, y in test_data
+    )
+    assert net.evaluate(test_data) == expected
+
+
+def test_dtype():
+    net = make_network()
+    x = np.random.randint(0, 256, (6, 4)).astype(np.float16)
+    y = np.eye(3, 4, dtype=np.uint8)
+    net.forward_backward(x, y)
+    for layer in net.layers:
+        assert layer.output_data.dtype == np.float32
+        assert layer.output_delta.dtype == np.float32
+    for layer in net.layers[::2]:
+        assert layer.weight.dtype == layer.delta_w.dtype == np.float32
+
+    net = SequentialNetwork(dtype=np.float64)
+    net.add(DenseLayer(6, 3))
+    assert net.single_forward(x).dtype == np.float64
+
+
+def test_buffers_are_reused():
+    net = make_network()
+    x = np.random.rand(6, 4)
+    y = np.random.rand(3, 4)
+    net.forward_backward(x, y)
+    arrays = [(layer.output_data, layer.output_delta) for layer in net.layers]
+    first = net.single_forward(x)
+    net.update(4, 0.1)
+    net.forward_backward(x, y)
+    for layer, (output_data, output_delta) in zip(net.layers, arrays):
+        assert layer.output_data is output_data
+        assert layer.output_delta is output_delta
+    # what single_forward returns doesn't change under it
+    assert not np.array_equal(first, net.single_forward(x))
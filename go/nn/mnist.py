@@ -5,27 +5,31 @@ import numpy as np
 from numpy import typing as nptype
 
 
-def encode_label(j):  # <1>
+def encode_label(j, dtype: nptype.DTypeLike = np.uint8):  # <1>
     """one-hot encode indices to vectors of length 10"""
-    e = np.zeros((10, 1))
-    e[j] = 1.0
+    e = np.zeros((10, 1), dtype=dtype)
+    e[j] = 1
     return e
 
-# A list of tuples, where the first is a 784-element ndarray of uint8, the
-# second a 10-element ndarray of float64
-Feature = Tuple[nptype.NDArray[np.uint8], nptype.NDArray[np.float64]]
+# A list of tuples, where the first is a 784-element ndarray, the second a
+# 10-element one-hot ndarray. Both are stored in whatever dtype load_data was
+# asked for (uint8 by default) and SequentialNetwork casts them to its own
+# float dtype a mini-batch at a time.
+Feature = Tuple[nptype.NDArray, nptype.NDArray]
 FeatureList = List[Feature]
 
-def shape_data(data: np.ndarray) -> FeatureList:
+def shape_data(data: np.ndarray, dtype: nptype.DTypeLike = np.uint8) -> FeatureList:
     """shape data into a list of tuples of (image, labels)
 
-    the image is a 784-element ndarray vector of uint8
-    the labels are 10-element ndarray vector of float64"""
+    the image is a 784-element ndarray vector of dtype
+    the labels are 10-element ndarray vector of dtype
+
+    pixels are 0-255, so uint8 or float16 both hold them exactly"""
     # Flatten the input images to feature vectors of length 784.
-    features = [np.reshape(x, (784, 1)) for x in data[0]]
+    features = [np.reshape(x, (784, 1)).astype(dtype) for x in data[0]]
 
     # All labels are one-hot encoded.
-    labels = [encode_label(y) for y in data[1]]
+    labels = [encode_label(y, dtype) for y in data[1]]
 
     # Create pairs of features and labels.
     return list(zip(features, labels))
@@ -46,6 +50,6 @@ def load_data_impl():
     f.close()
     return (x_train, y_train), (x_test, y_test)
 
-def load_data() -> Tuple[FeatureList, FeatureList]:
+def load_data(dtype: nptype.DTypeLike = np.uint8) -> Tuple[FeatureList, FeatureList]:
     train_data, test_data = load_data_impl()
-    return shape_data(train_data), shape_data(test_data)
+    return shape_data(train_data, dtype), shape_data(test_data, dtype)
@@ -2,9 +2,16 @@ import time
 
 import numpy as np
 from scipy.special import expit
+from go.nn.activations import ACTIVATIONS, get_activation
 from go.nn.layer import ActivationLayer
 
-from .layer import sigmoid, sigmoid_prime, sigmoid_prime_scipy
+from .layer import (
+    sigmoid,
+    sigmoid_prime,
+    sigmoid_prime_scalar,
+    sigmoid_prime_scipy,
+    sigmoid_scalar,
+)
 
 
 def test_sigmoid():
@@ -30,6 +37,53 @@ def test_equiv_deriv():
         assert np.allclose(sig, scip), f"{sig} != {scip}"
 
 
+def test_equiv_scalar():
+    matrix = np.random.randn(10, 10) * 5
+    assert np.allclose(sigmoid(matrix), sigmoid_scalar(matrix))
+    assert np.allclose(sigmoid_prime(matrix), sigmoid_prime_scalar(matrix))
+
+
+REFERENCE = {
+    "sigmoid": sigmoid_scalar,
+    "tanh": np.tanh,
+    "relu": lambda z: np.where(z > 0, z, 0),
+    "leaky_relu": lambda z: np.where(z > 0, z, 0.01 * z),
+    "softplus": lambda z: np.log(1 + np.exp(z)),
+}
+
+
+def test_activations():
+    assert set(REFERENCE) == set(ACTIVATIONS)
+    # stay away from relu's kink at 0, where the numerical derivative is off
+    matrix = np.random.randn(10, 10) * 3
+    matrix[np.abs(matrix) < 0.01] = 0.5
+    delta = np.random.randn(10, 10)
+    h = 1e-6
+    for name, reference in REFERENCE.items():
+        activation = get_activation(name)
+        a = activation.forward(matrix, out=np.empty_like(matrix))
+        assert np.allclose(a, reference(matrix)), name
+
+        numerical = (reference(matrix + h) - reference(matrix - h)) / (2 * h)
+        out = activation.backward(matrix, a, delta, out=np.empty_like(matrix))
+        assert np.allclose(out, delta * numerical, atol=1e-6), name
+
+
+def test_activation_layers():
+    for name in ACTIVATIONS:
+        data = np.random.randn(10, 4).astype(np.float32)
+        layer = ActivationLayer(10, name)
+        layer.input_data = data
+        layer.input_delta = np.ones((10, 4), dtype=np.float32)
+        layer.forward()
+        layer.backward()
+        assert layer.output_data is not None and layer.output_delta is not None
+        assert layer.output_data.dtype == layer.output_delta.dtype == np.float32
+        z = data.astype(np.float64)
+        numerical = (REFERENCE[name](z + 1e-6) - REFERENCE[name](z - 1e-6)) / 2e-6
+        assert np.allclose(layer.output_delta, numerical, atol=1e-4), name
+
+
 # TODO: move this into a benchmarking script
 # def test_benchmark_ActivationLayer():
 #     nsteps = 100
@@ -0,0 +1,218 @@
+import re
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from go.goboard import Board, GameState
+from go.gotypes import Move, Player, Point
+from go.scoring import KOMI, compute_game_result
+
+# Just enough SGF (https://www.red-bean.com/sgf/) to get games in and out:
+# board size, komi, result, handicap stones and the main line of moves.
+# Variations, comments and everything else are skipped on the way in. Setup
+# stones (AB, AW, AE) are only understood before the first move; GameState
+# has no way to drop stones onto a game in progress, so files that do that
+# are rejected rather than quietly played out wrong.
+
+# a "(", ")" or ";", or a property: its name and all of its [values]
+TOKEN = re.compile(
+    r"\s*(?:([();])|([A-Za-z]+)((?:\s*\[(?:\\.|[^\]\\])*\])+))", re.DOTALL
+)
+VALUE = re.compile(r"\[((?:\\.|[^\]\\])*)\]", re.DOTALL)
+# a backslash escapes the next character, or drops a line break altogether
+ESCAPE = re.compile(r"\\(\n|.)", re.DOTALL)
+
+COLORS = {"B": Player.black, "W": Player.white}
+SETUP = {"AB": Player.black, "AW": Player.white}
+
+
+class SGFError(ValueError):
+    pass
+
+
+class SGFGame:
+    def __init__(
+        self,
+        board_size: int,
+        komi: float = KOMI,
+        result: Optional[str] = None,
+        setup: Optional[Dict[Player, List[Point]]] = None,
+        first_player: Player = Player.black,
+        moves: Optional[List[Tuple[Player, Move]]] = None,
+    ):
+        self.board_size = board_size
+        self.komi = komi
+        # RE as it appears in the file, e.g. "B+3.5" or "W+R"
+        self.result = result
+        # stones on the board before the first move, e.g. handicap stones
+        self.setup = setup or {Player.black: [], Player.white: []}
+        self.first_player = first_player
+        self.moves = moves or []
+
+    @property
+    def winner(self) -> Optional[Player]:
+        if self.result and self.result[0] in COLORS:
+            return COLORS[self.result[0]]
+        return None
+
+    def replay(self, track_planes: bool = False) -> Iterator[Tuple[GameState, Move]]:
+        """replay:
+        Each position in the main line along with the move played from it.
+
+        GameState has the players strictly alternate, so if the record has
+        the same color move twice in a row, the other player passes in
+        between.
+        """
+        board = Board(self.board_size, self.board_size, track_planes)
+        for player, points in self.setup.items():
+            for point in points:
+                board.place_stone(player, point)
+        state = GameState(board, self.first_player, None, None)
+        for player, move in self.moves:
+            if player != state.next_player:
+                state = state.apply_move(Move.pass_turn())
+            yield state, move
+            state = state.apply_move(move)
+
+
+def decode_point(value: str, board_size: int) -> Optional[Point]:
+    """an SGF coordinate, or None for a pass"""
+    # "tt" is how FF[3] and earlier spell a pass on boards up to 19x19
+    if value == "" or (value == "tt" and board_size <= 19):
+        return None
+    if len(value) != 2:
+        raise SGFError(f"bad point {value!r}")
+    col = ord(value[0]) - ord("a") + 1
+    # SGF counts rows from the top, we count them from the bottom
+    row = board_size - (ord(value[1]) - ord("a"))
+    if not (1 <= row <= board_size and 1 <= col <= board_size):
+        raise SGFError(f"point {value!r} is off a {board_size}x{board_size} board")
+    return Point(row=row, col=col)
+
+
+def encode_point(point: Point, board_size: int) -> str:
+    return chr(ord("a") + point.col - 1) + chr(ord("a") + board_size - point.row)
+
+
+def parse_sgf(text: str) -> SGFGame:
+    """parse the first game tree in `text`, following the main line"""
+    nodes: List[Dict[str, List[str]]] = []
+    started = False
+    pos = 0
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if match is None:
+            if text[pos:].strip() == "":
+                break
+            raise SGFError(f"can't parse SGF at {text[pos:pos + 20]!r}")
+        pos = match.end()
+        punctuation, name, values = match.groups()
+        if punctuation == "(":
+            started = True
+        elif punctuation == ";":
+            nodes.append({})
+        elif punctuation == ")":
+            # the first variation to close is the end of the main line
+            break
+        elif nodes:
+            # FF[3] allowed lower case letters in property names
+            name = "".join(c for c in name if c.isupper())
+            nodes[-1][name] = [
+                ESCAPE.sub(lambda m: "" if m.group(1) == "\n" else m.group(1), v)
+                for v in VALUE.findall(values)
+            ]
+    if not started or not nodes:
+        raise SGFError("no game tree")
+
+    root = nodes[0]
+    board_size = int(root.get("SZ", ["19"])[0].split(":")[0])
+    komi = float(root["KM"][0]) if root.get("KM", [""])[0] else KOMI
+    result = root.get("RE", [None])[0]
+    game = SGFGame(board_size, komi, result)
+    has_first_player = False
+    for node in nodes:
+        if game.moves and any(prop in node for prop in ("AB", "AW", "AE")):
+            raise SGFError(
+                f"setup stones after move {len(game.moves)} aren't supported"
+            )
+        for prop, player in SETUP.items():
+            for value in node.get(prop, []):
+                point = decode_point(value, board_size)
+                if point is not None:
+                    game.setup[player].append(point)
+        for value in node.get("AE", []):
+            point = decode_point(value, board_size)
+            for points in game.setup.values():
+                if point is not None and point in points:
+                    points.remove(point)
+        if "PL" in node and not game.moves:
+            game.first_player = COLORS[node["PL"][0].upper()[:1]]
+            has_first_player = True
+        for prop, player in COLORS.items():
+            if prop in node:
+                point = decode_point(node[prop][0], board_size)
+                move = Move.pass_turn() if point is None else Move.play(point)
+                game.moves.append((player, move))
+    # without a PL, whoever moves first (white, in handicap games) goes first
+    if not has_first_player and game.moves:
+        game.first_player = game.moves[0][0]
+    return game
+
+
+def to_sgf(
+    board_size: int,
+    moves: Sequence[Move],
+    komi: float = KOMI,
+    result: Optional[str] = None,
+    first_player: Player = Player.black,
+) -> str:
+    """to_sgf:
+    A game as SGF. Players alternate starting with first_player; resigning
+    ends the game and shows up in the result rather than as a move.
+    """
+    header = f"(;FF[4]GM[1]CA[UTF-8]SZ[{board_size}]KM[{komi:g}]"
+    if result:
+        header += f"RE[{result}]"
+    parts = [header]
+    player = first_player
+    for move in moves:
+        if move.is_resign:
+            break
+        if move.is_pass:
+            value = ""
+        else:
+            assert move.point
+            value = encode_point(move.point, board_size)
+        parts.append(f";{'B' if player == Player.black else 'W'}[{value}]")
+        player = player.other
+    parts.append(")\n")
+    return "".join(parts)
+
+
+def game_to_sgf(game_state: GameState) -> str:
+    """every move that led to game_state as SGF, with the result if it's over"""
+    moves = []
+    state: Optional[GameState] = game_state
+    while state is not None and state.last_move is not None:
+        moves.append(state.last_move)
+        state = state.previous_state
+    moves.reverse()
+
+    result = None
+    winner = game_state.winner()
+    if winner is not None:
+        assert game_state.last_move
+        if game_state.last_move.is_resign:
+            result = f"{'B' if winner == Player.black else 'W'}+R"
+        else:
+            result = str(compute_game_result(game_state))
+    # compute_game_result always scores with KOMI
+    return to_sgf(game_state.board.num_rows, moves, KOMI, result)
+
+
+def read_sgf(path: str) -> SGFGame:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return parse_sgf(f.read())
+
+
+def write_sgf(path: str, game_state: GameState):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(game_to_sgf(game_state))
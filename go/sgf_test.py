@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from go.agent.naive import RandomBot
+from go.goboard import GameState
+from go.gotypes import Move, Player
+from go.sgf import SGFError, game_to_sgf, parse_sgf
+from go.utils import point_from_coords
+
+GAME = """(;GM[1]FF[4]SZ[9]KM[0.5]RE[W+R]AB[cc][gg]
+C[two stones \\] of handicap]
+;W[ee](;B[dc];W[]
+;B[tt])(;B[aa]))
+"""
+
+
+def test_parse_sgf_follows_the_main_line():
+    game = parse_sgf(GAME)
+    assert game.board_size == 9
+    assert game.komi == 0.5
+    assert game.winner == Player.white
+    assert game.setup[Player.black] == [
+        point_from_coords("C7"),
+        point_from_coords("G3"),
+    ]
+    assert game.first_player == Player.white
+    assert [(player, move.point) for player, move in game.moves] == [
+        (Player.white, point_from_coords("E5")),
+        (Player.black, point_from_coords("D7")),
+        (Player.white, None),
+        (Player.black, None),
+    ]
+    states = [state for state, _ in game.replay()]
+    assert states[0].board.get(point_from_coords("G3")) == Player.black
+    assert states[-1].board.get(point_from_coords("D7")) == Player.black
+
+
+def test_setup_stones():
+    game = parse_sgf("(;SZ[5]AB[aa][bb]AW[cc];AE[bb];B[dd])")
+    assert game.setup[Player.black] == [point_from_coords("A5")]
+    assert game.setup[Player.white] == [point_from_coords("C3")]
+
+    # stones can't be added or taken away once the game is under way
+    for setup in ["AB[aa]", "AW[aa]", "AE[dd]"]:
+        with pytest.raises(SGFError):
+            parse_sgf(f"(;SZ[5];B[dd];{setup};W[cc])")
+
+
+def test_sgf_round_trip():
+    random.seed(11)
+    bot = RandomBot()
+    game = GameState.new_game(5)
+    while not game.is_over():
+        game = game.apply_move(bot.select_move(game))
+    parsed = parse_sgf(game_to_sgf(game))
+
+    state = GameState.new_game(5)
+    for player, move in parsed.moves:
+        assert player == state.next_player
+        state = state.apply_move(move)
+    assert state.board.to_array().tolist() == game.board.to_array().tolist()
+    assert parsed.winner == game.winner()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import argparse
 import os
 import sys
 import time
@@ -8,10 +9,15 @@ sys.path.insert(0, os.path.dirname(sys.argv[0]) + "/..")
 from go.agent.naive import RandomBot
 from go.goboard import GameState
 from go.gotypes import Player
+from go.sgf import write_sgf
 from go.utils import print_board, print_move
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sgf-out", help="save the game as SGF to this file")
+    args = parser.parse_args()
+
     board_size = 9
     game = GameState.new_game(board_size)
     bots = {
@@ -29,6 +35,9 @@ def main():
         print_move(game.next_player, bot_move)
         game = game.apply_move(bot_move)
 
+    if args.sgf_out:
+        write_sgf(args.sgf_out, game)
+
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 import argparse
-from typing import Tuple
+from multiprocessing import Pool
+import random
+import time
+from typing import Iterator, NamedTuple, Tuple
 import os
 import sys
 
@@ -9,38 +12,173 @@ sys.path.insert(0, os.path.dirname(sys.argv[0]) + "/..")
 import numpy as np
 import numpy.typing as nptype
 
+from go.data.compact import BOARD_DTYPE, MOVE_DTYPE, compact_fields
+from go.data.records import (
+    BLACK_WON,
+    WHITE_WON,
+    GameRecordWriter,
+    encode_moves,
+    encode_winner,
+)
+from go.data.shards import DEFAULT_SHARD_SIZE, ShardWriter
 from go.encoders.encoder import get_encoder_by_name
+from go.encoders.history import HistoryEncoder
 
 # in the book they import goboard_fast, but I'm trying to avoid copying
 # that until I've tried my own hand at going faster
 from go.goboard import GameState
+from go.gotypes import decode_move
 from go.agent import mcts
+from go.sgf import to_sgf
 from go.utils import print_board, print_move
 
 
+class GameRecord(NamedTuple):
+    """what a game comes back as, small enough to send back from a worker"""
+
+    # encoded boards and the point index of the move played from each, in the
+    # compact dataset format (see go.data.compact)
+    boards: nptype.NDArray[np.int8]
+    moves: nptype.NDArray[np.int16]
+    # every move played, passes included, and the result, as go.data.records
+    # codes
+    record: nptype.NDArray[np.int16]
+    winner: int
+
+
 def generate_game(
-    board_size: int, rounds: int, max_moves: int, temperature: float
-) -> Tuple[nptype.NDArray[np.float64], nptype.NDArray[np.float64]]:
+    board_size: int,
+    bot: mcts.MCTSAgent,
+    max_moves: int,
+    encoder_name: str = "plane",
+    quiet: bool = False,
+) -> GameRecord:
     boards, moves = [], []
-    encoder = get_encoder_by_name("plane", board_size)
-    game = GameState.new_game(board_size)
-    # TODO: implement MCTSAgent
-    bot = mcts.MCTSAgent(rounds, temperature)
+    encoder = get_encoder_by_name(encoder_name, board_size)
+    game = GameState.new_game(board_size, track_planes=True)
+    # history encoders get fed one position per move instead of re-encoding
+    # the whole history every time
+    history = None
+    if isinstance(encoder, HistoryEncoder):
+        history = encoder.new_buffer()
+        history.push(game)
     num_moves = 0
+    # rollout lengths over the whole game, for the histogram at the end
+    game_stats = mcts.SearchStats()
     while not game.is_over():
-        print_board(game.board)
+        if not quiet:
+            print_board(game.board)
         move = bot.select_move(game)
+        game_stats.rollout_lengths.update(bot.last_stats.rollout_lengths)
+        if not quiet:
+            print(bot.last_stats)
         if move.is_play:
-            boards.append(encoder.encode(game))
-            move_one_hot = np.zeros(encoder.num_points())
-            move_one_hot[encoder.encode_point(move.point)] = 1
-            moves.append(move_one_hot)
-        print_move(game.next_player, move)
+            if history is not None:
+                # planes() is a view onto the ring buffer, which moves on
+                boards.append(history.planes().copy())
+            else:
+                boards.append(encoder.encode(game))
+            moves.append(encoder.encode_point(move.point))
+        if not quiet:
+            print_move(game.next_player, move)
         game = game.apply_move(move)
+        if history is not None:
+            history.push(game)
         num_moves += 1
         if num_moves > max_moves:
             break
-    return np.array(boards), np.array(moves)
+    if not quiet:
+        print_rollout_histogram(game_stats)
+    return GameRecord(
+        np.array(boards, dtype=BOARD_DTYPE).reshape((-1,) + encoder.shape()),
+        np.array(moves, dtype=MOVE_DTYPE),
+        encode_moves(game),
+        encode_winner(game.winner()),
+    )
+
+
+def print_rollout_histogram(stats: mcts.SearchStats, bin_width: int = 10):
+    histogram = stats.rollout_histogram(bin_width)
+    if not histogram:
+        return
+    print("rollout lengths:")
+    widest = max(count for _, count in histogram)
+    for start, count in histogram:
+        bar = "#" * max(1, round(40 * count / widest))
+        print(f"  {start:4d}-{start + bin_width - 1:<4d} {count:7d} {bar}")
+
+
+def make_bot(args: argparse.Namespace) -> mcts.MCTSAgent:
+    return mcts.MCTSAgent(
+        args.rounds,
+        args.temperature,
+        tree=args.tree,
+        max_nodes=args.max_nodes,
+        rave=args.rave,
+        early_stop=args.early_stop or args.early_stop_confidence is not None,
+        early_stop_confidence=args.early_stop_confidence,
+        max_rollout_moves=(
+            int(args.rollout_cap * args.board_size**2) if args.rollout_cap else None
+        ),
+        rollout_policy=args.rollout_policy,
+    )
+
+
+def play_game(task: Tuple[int, argparse.Namespace]) -> GameRecord:
+    """play one game quietly in a worker process, seeded by its task"""
+    seed, args = task
+    random.seed(seed)
+    np.random.seed(seed)
+    return generate_game(
+        args.board_size, make_bot(args), args.max_moves, args.encoder, quiet=True
+    )
+
+
+def play_games(args: argparse.Namespace, first_game: int) -> Iterator[GameRecord]:
+    """play games first_game..num_games, in order"""
+    if args.workers > 1:
+        # a seed per game rather than per process, so that which worker ends
+        # up playing a game (or whether we're resuming) doesn't change how it
+        # goes
+        seeds = np.random.SeedSequence(args.seed).generate_state(args.num_games)
+        tasks = [(int(seed), args) for seed in seeds[first_game:]]
+        with Pool(args.workers) as pool:
+            yield from pool.imap(play_game, tasks)
+    else:
+        if args.seed is not None:
+            random.seed(args.seed)
+            np.random.seed(args.seed)
+        bot = make_bot(args)
+        for i in range(first_game, args.num_games):
+            print(f"Generating game {i+1}/{args.num_games}")
+            yield generate_game(args.board_size, bot, args.max_moves, args.encoder)
+
+
+def save_sgf(directory: str, index: int, game: GameRecord, board_size: int):
+    moves = [decode_move(int(code), board_size) for code in game.record]
+    # we only know who won, which SGF writes as "B+" or "W+"
+    result = {BLACK_WON: "B+", WHITE_WON: "W+"}.get(game.winner)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"game-{index:06d}.sgf"), "w") as f:
+        f.write(to_sgf(board_size, moves, result=result))
+
+
+class Progress:
+    def __init__(self, num_games: int):
+        self.num_games = num_games
+        self.games = 0
+        self.moves = 0
+        self.start = time.monotonic()
+
+    def update(self, num_moves: int):
+        self.games += 1
+        self.moves += num_moves
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        print(
+            f"{self.games}/{self.num_games} games, "
+            f"{self.games / elapsed:.2f} games/s, {self.moves / elapsed:.1f} moves/s",
+            flush=True,
+        )
 
 
 def main():
@@ -52,27 +190,144 @@ def main():
         "--max-moves", "-m", type=int, default=60, help="max moves per game"
     )
     parser.add_argument("--num-games", "-n", type=int, default=10)
+    parser.add_argument(
+        "--tree",
+        choices=mcts.TREE_BACKENDS,
+        default="node",
+        help="MCTS tree storage: node objects or a packed node pool",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        help="cap on live MCTS tree nodes; the coldest subtrees are pruned past it",
+    )
+    parser.add_argument(
+        "--rave",
+        action="store_true",
+        help="blend all-moves-as-first statistics into MCTS selection",
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="stop searching once the chosen move can't change",
+    )
+    parser.add_argument(
+        "--early-stop-confidence",
+        type=float,
+        help="also stop when the best move is ahead at this confidence",
+    )
+    parser.add_argument(
+        "--rollout-cap",
+        type=float,
+        help="cut rollouts off after this many times the board area in moves",
+    )
+    parser.add_argument(
+        "--rollout-policy",
+        choices=sorted(mcts.ROLLOUT_POLICIES),
+        default="random",
+        help="bot used to play out MCTS rollouts",
+    )
+    parser.add_argument(
+        "--encoder",
+        default="plane",
+        help="name of the module in go.encoders to encode boards with",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="play games in this many processes, without printing the boards",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="base seed; each game gets its own seed derived from it",
+    )
+    parser.add_argument(
+        "--out-dir",
+        help="stream games into shards in this directory, picking up where an "
+        "earlier run into it left off",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="samples per shard with --out-dir",
+    )
+    parser.add_argument(
+        "--records-out",
+        help="save every game's moves and result to this .npz, see "
+        "go.data.records (not with --out-dir)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        help="with --records-out, also save the board every this many moves",
+    )
+    parser.add_argument(
+        "--sgf-out", help="also save every game as SGF in this directory"
+    )
     parser.add_argument("--board-out", help="name of the file to write boards to")
+    parser.add_argument(
+        "--one-hot",
+        action="store_true",
+        help="write --board-out/--move-out as float64 boards and one-hot moves "
+        "rather than int8 boards and int16 move indices",
+    )
     parser.add_argument("--move-out", help="name of the file to write moves to")
 
     args = parser.parse_args()
+    if args.out_dir and args.records_out:
+        parser.error("--records-out can't be resumed, so it can't go with --out-dir")
+
+    if args.out_dir:
+        write_shards(args)
+        return
 
     xs = []
     ys = []
-
-    for i in range(args.num_games):
-        print(f"Generating game {i+1}/{args.num_games}")
-        x, y = generate_game(
-            args.board_size, args.rounds, args.max_moves, args.temperature
-        )
-        xs.append(x)
-        ys.append(y)
+    progress = Progress(args.num_games)
+    records = None
+    if args.records_out:
+        records = GameRecordWriter(args.board_size, args.checkpoint_every)
+    for i, game in enumerate(play_games(args, 0)):
+        if args.sgf_out:
+            save_sgf(args.sgf_out, i, game, args.board_size)
+        xs.append(game.boards)
+        ys.append(game.moves)
+        if records is not None:
+            records.add_game(game.record, game.winner)
+        progress.update(len(game.record))
+    if records is not None:
+        records.save(args.records_out)
 
     x = np.concatenate(xs)
     y = np.concatenate(ys)
+    if args.one_hot:
+        x = x.astype(np.float64)
+        y = np.eye(args.board_size**2)[y]
+
+    if args.board_out:
+        np.save(args.board_out, x)
+    if args.move_out:
+        np.save(args.move_out, y)
+
 
-    np.save(args.board_out, x)
-    np.save(args.move_out, y)
+def write_shards(args: argparse.Namespace):
+    encoder = get_encoder_by_name(args.encoder, args.board_size)
+    with ShardWriter(args.out_dir, compact_fields(encoder), args.shard_size) as writer:
+        first_game = writer.info.get("games", 0)
+        if first_game:
+            print(f"Resuming after {first_game} games")
+        progress = Progress(args.num_games - first_game)
+        for i, game in enumerate(play_games(args, first_game)):
+            if args.sgf_out:
+                save_sgf(args.sgf_out, first_game + i, game, args.board_size)
+            writer.append(boards=game.boards, moves=game.moves)
+            writer.checkpoint(games=first_game + i + 1)
+            progress.update(len(game.record))
 
 
 if __name__ == "__main__":
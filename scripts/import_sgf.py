@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+import argparse
+from multiprocessing import Pool
+import os
+import sys
+import time
+from typing import Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(sys.argv[0]) + "/..")
+
+import numpy as np
+import numpy.typing as nptype
+
+from go.data.compact import BOARD_DTYPE, MOVE_DTYPE, compact_fields
+from go.data.shards import DEFAULT_SHARD_SIZE, ShardWriter
+from go.encoders.encoder import get_encoder_by_name
+from go.sgf import read_sgf
+
+# how often we checkpoint the shards, in files
+CHECKPOINT_EVERY = 256
+
+Samples = Tuple[nptype.NDArray[np.int8], nptype.NDArray[np.int16]]
+
+
+def find_sgf_files(directory: str):
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(".sgf"))
+    # sorted, so that a resumed import sees the files in the same order
+    return sorted(paths)
+
+
+def encode_file(task: Tuple[str, str, int]) -> Optional[Samples]:
+    """the training samples from one SGF file, or None if we can't use it"""
+    path, encoder_name, board_size = task
+    try:
+        game = read_sgf(path)
+        if game.board_size != board_size:
+            return None
+        encoder = get_encoder_by_name(encoder_name, board_size)
+        states, moves = [], []
+        for state, move in game.replay(track_planes=True):
+            if move.is_play:
+                states.append(state)
+                moves.append(encoder.encode_point(move.point))
+    except (ValueError, AssertionError, KeyError, IndexError) as e:
+        # plenty of files in the wild are broken or have illegal moves in
+        print(f"skipping {path}: {e!r}", file=sys.stderr)
+        return None
+    boards = np.empty((len(states),) + encoder.shape(), dtype=BOARD_DTYPE)
+    encoder.encode_batch(states, out=boards)
+    return boards, np.array(moves, dtype=MOVE_DTYPE)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="encode a directory of SGF games into dataset shards"
+    )
+    parser.add_argument("sgf_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--board-size", "-b", type=int, default=19)
+    parser.add_argument("--encoder", default="plane")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    args = parser.parse_args()
+
+    paths = find_sgf_files(args.sgf_dir)
+    encoder = get_encoder_by_name(args.encoder, args.board_size)
+    with ShardWriter(args.out_dir, compact_fields(encoder), args.shard_size) as writer:
+        done = writer.info.get("files", 0)
+        skipped = writer.info.get("skipped", 0)
+        if done:
+            print(f"Resuming after {done} of {len(paths)} files")
+        tasks = [(path, args.encoder, args.board_size) for path in paths[done:]]
+        start = time.monotonic()
+        with Pool(args.workers) as pool:
+            # imap rather than imap_unordered so that "files done" is a
+            # prefix of the sorted list, which is what makes resuming work
+            for i, samples in enumerate(pool.imap(encode_file, tasks, chunksize=16)):
+                if samples is None:
+                    skipped += 1
+                else:
+                    writer.append(boards=samples[0], moves=samples[1])
+                if (i + 1) % CHECKPOINT_EVERY == 0 or i + 1 == len(tasks):
+                    writer.checkpoint(files=done + i + 1, skipped=skipped)
+                    elapsed = max(time.monotonic() - start, 1e-9)
+                    print(
+                        f"{done + i + 1}/{len(paths)} files, {skipped} skipped, "
+                        f"{writer.num_samples} samples, {(i + 1) / elapsed:.1f} files/s",
+                        flush=True,
+                    )
+
+
+if __name__ == "__main__":
+    main()